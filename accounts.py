@@ -0,0 +1,64 @@
+from numbers import Number
+
+from block import address_key
+
+# Sender of the mining reward: coins are created, nobody is debited
+REWARD_SENDER = '0'
+
+
+def _amount(tx):
+    # Only numeric amounts move balances; the API accepts any JSON value
+    amount = tx.get('cantidad')
+    if isinstance(amount, Number) and not isinstance(amount, bool):
+        return amount
+    return 0
+
+
+class AccountIndex:
+    """Balances and transaction references per address, kept in step with the chain.
+
+    apply() is called for every block appended to the chain and revert() for
+    every block dropped from its end, newest first, so a lookup never has to
+    scan the chain. Each reference is a (block index, position) pair.
+    """
+
+    def __init__(self):
+        self.balances = {}
+        self.history = {}
+
+    def balance(self, address):
+        return self.balances.get(address_key(address), 0)
+
+    def references(self, address, start=0, stop=None):
+        return self.history.get(address_key(address), [])[start:stop]
+
+    def count(self, address):
+        return len(self.history.get(address_key(address), ()))
+
+    def _addresses(self, tx):
+        if tx.get('emisor') != REWARD_SENDER:
+            yield address_key(tx.get('emisor')), -1
+        if 'receptor' in tx:
+            yield address_key(tx['receptor']), 1
+
+    def apply(self, block):
+        for position, tx in enumerate(block['transacciones']):
+            amount = _amount(tx)
+            for address, sign in self._addresses(tx):
+                self.balances[address] = self.balances.get(address, 0) + sign * amount
+                refs = self.history.setdefault(address, [])
+                if not refs or refs[-1] != (block['indice'], position):  # sender == recipient
+                    refs.append((block['indice'], position))
+
+    def revert(self, block):
+        for position in reversed(range(len(block['transacciones']))):
+            tx = block['transacciones'][position]
+            amount = _amount(tx)
+            for address, sign in self._addresses(tx):
+                self.balances[address] = self.balances.get(address, 0) - sign * amount
+                refs = self.history.get(address)
+                if refs and refs[-1] == (block['indice'], position):
+                    refs.pop()
+                if not refs:
+                    self.history.pop(address, None)
+                    self.balances.pop(address, None)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+from collections.abc import Mapping
+
+import merkle
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True)
+
+
+class Transaction(Mapping):
+    """Immutable transaction that reads like the {'emisor', 'receptor', 'cantidad'} dict."""
+
+    __slots__ = ('sender', 'recipient', 'amount', '_canonical')
+
+    # Wire key -> attribute, in the order the JSON wire format uses
+    KEYS = {'emisor': 'sender', 'receptor': 'recipient', 'cantidad': 'amount'}
+
+    def __init__(self, sender, recipient, amount):
+        self.sender = sender
+        self.recipient = recipient
+        self.amount = amount
+        self._canonical = None
+
+    @classmethod
+    def from_dict(cls, data):
+        # Anything that is not exactly a plain transaction stays a dict so its
+        # serialization (and so the block hash) is preserved
+        if not isinstance(data, dict) or data.keys() != cls.KEYS.keys():
+            return data
+        return cls(data['emisor'], data['receptor'], data['cantidad'])
+
+    def __getitem__(self, key):
+        return getattr(self, self.KEYS[key])
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f'Transaction({self.sender!r}, {self.recipient!r}, {self.amount!r})'
+
+    def to_dict(self):
+        return {'emisor': self.sender, 'receptor': self.recipient, 'cantidad': self.amount}
+
+    def canonical(self):
+        # Same bytes as json.dumps(self.to_dict(), sort_keys=True), built once
+        if self._canonical is None:
+            self._canonical = ('{"cantidad": %s, "emisor": %s, "receptor": %s}' % (
+                _dumps(self.amount), _dumps(self.sender), _dumps(self.recipient))).encode()
+        return self._canonical
+
+
+def canonical_transaction(tx):
+    if isinstance(tx, Transaction):
+        return tx.canonical()
+    return _dumps(tx).encode()
+
+
+def address_key(address):
+    # Addresses come from JSON and may not be hashable
+    return address if isinstance(address, str) else _dumps(address)
+
+
+def transactions_root(transactions):
+    # Merkle root computed from scratch, for checking untrusted blocks
+    leaves = [merkle.leaf_hash(canonical_transaction(tx)) for tx in transactions]
+    return merkle.root(merkle.build_levels(leaves))
+
+
+class Block(Mapping):
+    """Block that reads (and can be edited) like the dict used on the wire.
+
+    canonical() is byte for byte json.dumps(block, sort_keys=True) and
+    header() the same for every field but the transactions, which are covered
+    by merkle_root. Both match what peers compute on the JSON format.
+    """
+
+    __slots__ = ('index', 'timestamp', 'transactions', 'merkle_root', 'target', 'proof', 'previous_hash',
+                 '_hash', '_tree')
+
+    KEYS = {
+        'indice': 'index',
+        'timestamp': 'timestamp',
+        'transacciones': 'transactions',
+        'merkle_root': 'merkle_root',
+        'objetivo': 'target',
+        'proof': 'proof',
+        'previous_hash': 'previous_hash',
+    }
+
+    def __init__(self, index, timestamp, transactions, merkle_root, target, proof, previous_hash):
+        self.index = index
+        self.timestamp = timestamp
+        self.transactions = transactions
+        self.merkle_root = merkle_root
+        self.target = target  # proof of work target, 64 hex digits
+        self.proof = proof
+        self.previous_hash = previous_hash
+        self._hash = None
+        self._tree = None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Block):
+            return data
+        return cls(
+            data['indice'],
+            data['timestamp'],
+            [Transaction.from_dict(tx) for tx in data['transacciones']],
+            data['merkle_root'],
+            data['objetivo'],
+            data['proof'],
+            data['previous_hash'],
+        )
+
+    def __getitem__(self, key):
+        return getattr(self, self.KEYS[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, self.KEYS[key], value)
+        self._hash = None
+        self._tree = None
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f'Block({self.to_dict()!r})'
+
+    def to_dict(self):
+        return {
+            'indice': self.index,
+            'timestamp': self.timestamp,
+            'transacciones': [tx.to_dict() if isinstance(tx, Transaction) else tx
+                              for tx in self.transactions],
+            'merkle_root': self.merkle_root,
+            'objetivo': self.target,
+            'proof': self.proof,
+            'previous_hash': self.previous_hash,
+        }
+
+    def _fields(self):
+        return (_dumps(self.index).encode(), _dumps(self.merkle_root).encode(), _dumps(self.target).encode(),
+                _dumps(self.previous_hash).encode(), _dumps(self.proof).encode(), _dumps(self.timestamp).encode())
+
+    def canonical(self):
+        transactions = b', '.join(canonical_transaction(tx) for tx in self.transactions)
+        return (b'{"indice": %s, "merkle_root": %s, "objetivo": %s, "previous_hash": %s, "proof": %s, '
+                b'"timestamp": %s, "transacciones": [%s]}' % (self._fields() + (transactions,)))
+
+    def header(self):
+        return (b'{"indice": %s, "merkle_root": %s, "objetivo": %s, "previous_hash": %s, "proof": %s, '
+                b'"timestamp": %s}' % self._fields())
+
+    def hash(self):
+        # Cached; editing a field through block[key] = value drops the cache.
+        # Code checking untrusted blocks should hash header() itself.
+        if self._hash is None:
+            self._hash = hashlib.sha256(self.header()).hexdigest()
+        return self._hash
+
+    def tree(self):
+        # Cached Merkle levels over the transactions, used to build proofs
+        if self._tree is None:
+            self._tree = merkle.build_levels(
+                [merkle.leaf_hash(canonical_transaction(tx)) for tx in self.transactions])
+        return self._tree
+
+    def merkle_proof(self, position):
+        return merkle.proof(self.tree(), position)
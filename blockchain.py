@@ -1,21 +1,66 @@
 import hashlib
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from uuid import uuid4
 from urllib.parse import urlparse
 import requests
-from flask import Flask, jsonify, request
+from requests.adapters import HTTPAdapter
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+import mining
+from accounts import AccountIndex
+from block import Block, Transaction, transactions_root
+from locks import RWLock
+from mempool import Mempool
+from mining import MiningScheduler, ParallelMiner
+from storage import SegmentLogStorage, SQLiteStorage, StoredChain
 
 
 class Blockchain:
-    def __init__(self):
-        self.chain = []
-        self.current_transactions = []
+    def __init__(self, workers=1, storage=None, window=1000):
+        self.storage = storage  # optional durable block store (see storage.py)
+        if storage is None:
+            self.chain = []
+            self.hashes = []  # hashes[i] is the cached hash of chain[i]
+        else:
+            # Only the last `window` blocks stay in memory, the rest is read
+            # from the store on demand
+            self.chain = StoredChain(storage, window, encode=Block.canonical,
+                                     decode=lambda data: Block.from_dict(json.loads(bytes(data))))
+            self.hashes = self.chain.hashes
+        # Writers (new blocks, consensus) hold `lock` only while changing the
+        # chain; proof of work and peer downloads run outside it
+        self.lock = RWLock()
+        self.accounts = AccountIndex()  # balances and history per address
+        self.total_work = 0  # expected hashes spent on the whole chain
+        for block in self.chain:
+            self.accounts.apply(block)
+            self.total_work += self.block_work(block)
+        self.current_transactions = Mempool()
+        self.max_block_transactions = 500  # mempool batch taken by each new block
         self.nodes = set()
-        self.difficulty = 4  # number of leading zeros required
-
-        # Create the genesis block
-        self.new_block(proof=100, previous_hash='1')
+        self.peer_timeout = 5  # seconds allowed for each peer request
+        self.consensus_deadline = 10  # seconds allowed for a whole resolve_conflicts round
+        self.peer_latency = {}  # node -> seconds taken by its last answer (None if it failed)
+        self.difficulty = 4  # minimum difficulty: leading zeros of the easiest target allowed
+        self.retarget_interval = 10  # blocks between target adjustments (0 keeps it fixed)
+        self.block_time = 10  # seconds a block should take on average
+        self.workers = workers  # processes used by proof_of_work
+        self.mining_stats = {}
+        self._miner = None
+
+        # Keep-alive connections to peers, shared by the consensus threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if not self.chain:
+            # Create the genesis block
+            self.new_block(proof=100, previous_hash='1')
 
     def register_node(self, address):
         parsed = urlparse(address)
@@ -25,95 +70,357 @@ class Blockchain:
             # when no scheme is provided
             self.nodes.add('http://' + parsed.path)
 
-    def valid_chain(self, chain):
-        last_block = chain[0]
-        current_index = 1
+    def valid_chain(self, chain, trusted=0):
+        # The first `trusted` blocks are assumed valid (e.g. a prefix shared
+        # with our own chain), so only the links after them are checked
+        start = max(trusted, 1)
+        last_block = chain[start - 1]
+        if not trusted and not self.valid_transactions(last_block):
+            return False
+        return self._link_blocks(last_block, self.hash(last_block), chain, start) is not None
+
+    def expected_target(self, position, block_at):
+        """Target the block at chain `position` (the genesis block is 0) must record.
+
+        `block_at(p)` returns the block at an earlier position. The target is
+        retargeted every `retarget_interval` blocks from the time the last
+        interval took; in between, each block keeps its parent's target.
+        """
+        max_target = mining.difficulty_target(self.difficulty)
+        if position <= 1:
+            return max_target
+        parent = block_at(position - 1)
+        target = int(parent['objetivo'], 16)
+        if self.retarget_interval and (position - 1) % self.retarget_interval == 0:
+            first = block_at(position - 1 - self.retarget_interval)
+            elapsed = parent['timestamp'] - first['timestamp']
+            return mining.retarget(target, elapsed, self.retarget_interval * self.block_time, max_target)
+        return min(target, max_target)
+
+    def next_target(self):
+        # Target for a block on top of our chain (callers hold the lock)
+        return self.expected_target(len(self.chain), self.chain.__getitem__)
+
+    @staticmethod
+    def block_work(block):
+        return mining.block_work(int(block['objetivo'], 16))
 
-        while current_index < len(chain):
-            block = chain[current_index]
+    @staticmethod
+    def valid_transactions(block):
+        # The block hash only covers the header, so the transactions must
+        # match the Merkle root it commits to
+        return block.get('merkle_root') == transactions_root(block['transacciones'])
+
+    def _link_blocks(self, last_block, last_hash, blocks, current_index=0, base=0):
+        # Checks that blocks[current_index:] extend `last_block` one after the
+        # other; returns their hashes, or None if a link is broken. `base` is
+        # the chain position of blocks[0], which must reach back far enough
+        # for the retarget window of the first block checked.
+        hashes = []
+
+        while current_index < len(blocks):
+            block = blocks[current_index]
             # Check that the hash of the block is correct
-            if block['previous_hash'] != self.hash(last_block):
-                return False
+            if block['previous_hash'] != last_hash:
+                return None
+
+            # Check that the block records the target the chain calls for
+            try:
+                target = self.expected_target(base + current_index, lambda p: blocks[p - base])
+            except (TypeError, ValueError):
+                return None
+            if block['objetivo'] != mining.target_hex(target):
+                return None
 
             # Check that the Proof of Work is correct
-            if not self.valid_proof(last_block['proof'], block['proof'], block['previous_hash']):
-                return False
+            if not self.valid_proof(last_block['proof'], block['proof'], block['previous_hash'], target):
+                return None
+
+            if not self.valid_transactions(block):
+                return None
 
             last_block = block
+            last_hash = self.hash(block)
+            hashes.append(last_hash)
             current_index += 1
 
+        return hashes
+
+    def fork_point(self, chain):
+        # Number of leading blocks `chain` shares with ours. Blocks are linked
+        # by hash, so a match at position i implies a match before it and a
+        # binary search needs only O(log n) hashes of the candidate.
+        low, high = 0, min(len(chain), len(self.chain))
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.hash(chain[mid - 1]) == self.hashes[mid - 1]:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    def replace_chain(self, chain):
+        # Adopt `chain` if it is valid, re-checking only the blocks after the
+        # prefix it shares with our chain
+        with self.lock.read():
+            shared = self.fork_point(chain)
+        if shared:
+            return self.extend_chain(chain[shared:], shared)
+
+        if not self.valid_transactions(chain[0]):
+            return False
+        genesis_hash = self.hash(chain[0])
+        hashes = self._link_blocks(chain[0], genesis_hash, chain, 1)
+        if hashes is None:
+            return False
+        with self.lock.write():
+            self._splice(0, chain, [genesis_hash] + hashes)
         return True
 
-    def resolve_conflicts(self):
-        neighbours = self.nodes
-        new_chain = None
-
-        max_length = len(self.chain)
+    def extend_chain(self, blocks, start):
+        # Adopt `blocks` as our chain from position `start` on, keeping (and
+        # trusting) our own blocks before it
+        with self.lock.read():
+            if not 1 <= start <= len(self.chain):
+                return False
+            anchor, anchor_hash = self.chain[start - 1], self.hashes[start - 1]
+            # Our blocks the first retarget among `blocks` may look back to
+            base = max(start - 1 - self.retarget_interval, 0)
+            window = self.chain[base:start]
+
+        # Validated without the lock, so reads and mining go on meanwhile
+        hashes = self._link_blocks(anchor, anchor_hash, window + list(blocks), len(window), base)
+        if hashes is None:
+            return False
+        with self.lock.write():
+            if len(self.chain) < start or self.hashes[start - 1] != anchor_hash:
+                return False  # our chain was replaced in the meantime
+            self._splice(start, blocks, hashes)
+        return True
 
-        for node in neighbours:
+    def _splice(self, start, blocks, hashes):
+        for block in reversed(self.chain[start:]):
+            self.accounts.revert(block)
+            self.total_work -= self.block_work(block)
+        if self.storage is not None:
+            self.chain.truncate(start)
+        else:
+            del self.chain[start:]
+            del self.hashes[start:]
+        for block, block_hash in zip(blocks, hashes):
+            self._append(Block.from_dict(block), block_hash)
+
+    def _append(self, block, block_hash):
+        if self.storage is not None:
+            self.chain.append(block, block_hash)
+        else:
+            self.chain.append(block)
+            self.hashes.append(block_hash)
+        self.accounts.apply(block)
+        self.total_work += self.block_work(block)
+
+    def locator(self):
+        # "indice:hash" of the last ten blocks, then exponentially sparser
+        # ones back to the genesis block
+        entries = []
+        position = len(self.chain) - 1
+        step = 1
+        while position > 0:
+            entries.append(f"{position + 1}:{self.hashes[position]}")
+            if len(entries) >= 10:
+                step *= 2
+            position -= step
+        entries.append(f"1:{self.hashes[0]}")
+        return ','.join(entries)
+
+    def locate(self, locator):
+        # Number of our blocks the peer that sent `locator` already has
+        for entry in locator.split(','):
+            index, _, block_hash = entry.partition(':')
             try:
-                resp = requests.get(f"{node}/cadena", timeout=5)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    length = data.get('longitud')
-                    chain = data.get('cadena')
-
-                    if length > max_length and self.valid_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.RequestException:
+                position = int(index) - 1
+            except ValueError:
                 continue
+            if 0 <= position < len(self.chain) and self.hashes[position] == block_hash:
+                return position + 1
+        return 0
+
+    def _get_peer(self, node, path):
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(f"{node}{path}", timeout=self.peer_timeout)
+            if resp.status_code != 200:
+                raise requests.RequestException(resp.status_code)
+            data = resp.json()
+        except (requests.RequestException, ValueError):
+            self.peer_latency[node] = None
+            return None
+        self.peer_latency[node] = time.perf_counter() - start
+        return data
+
+    def _query_peers(self, path):
+        # GET `path` from every peer at once; answers that miss the round
+        # deadline are ignored
+        nodes = list(self.nodes)
+        if not nodes:
+            return {}
+
+        executor = ThreadPoolExecutor(max_workers=min(32, len(nodes)))
+        futures = {executor.submit(self._get_peer, node, path): node for node in nodes}
+        answers = {}
+        try:
+            for future in as_completed(futures, timeout=self.consensus_deadline):
+                data = future.result()
+                if data is not None:
+                    answers[futures[future]] = data
+        except FuturesTimeoutError:
+            pass
+        executor.shutdown(wait=False, cancel_futures=True)
+        return answers
 
-        if new_chain:
-            self.chain = new_chain
-            return True
+    def resolve_conflicts(self):
+        # Poll the small summaries first and only download the chain of the
+        # best candidate, falling back to the next one if it does not validate
+        candidates = []
+        for node, summary in self._query_peers('/cadena/resumen').items():
+            length = summary.get('longitud') or 0
+            if length > len(self.chain):
+                candidates.append((length, summary.get('trabajo') or 0, node))
+
+        for length, work, node in sorted(candidates, reverse=True):
+            # The locator lets the peer send only the blocks we are missing
+            with self.lock.read():
+                locator = self.locator()
+            data = self._get_peer(node, '/cadena?localizador=' + locator)
+            try:
+                blocks = [Block.from_dict(block) for block in data.get('cadena') or []]
+            except (AttributeError, KeyError, TypeError):
+                continue
+            if not blocks:
+                continue
+            start = (data.get('desde') or 1) - 1
+            if start + len(blocks) <= len(self.chain):
+                continue
+            if start == 0:
+                adopted = self.replace_chain(blocks)
+            else:
+                adopted = self.extend_chain(blocks, start)
+            if adopted:
+                return True
 
         return False
 
-    def new_block(self, proof, previous_hash=None):
-        block = {
-            'indice': len(self.chain) + 1,
-            'timestamp': time.time(),
-            'transacciones': self.current_transactions,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1]),
-        }
-
-        self.current_transactions = []
-        self.chain.append(block)
+    def cumulative_work(self):
+        # Expected number of hashes spent on the chain, from each block's target
+        return self.total_work
+
+    def summary(self):
+        with self.lock.read():
+            return {
+                'longitud': len(self.chain),
+                'ultimo_hash': self.last_hash,
+                'trabajo': self.cumulative_work(),
+            }
+
+    def new_block(self, proof, previous_hash=None, target=None):
+        # Only the oldest max_block_transactions pending transactions go in,
+        # the rest wait for the following blocks. `target` is the one the
+        # proof was mined against, by default the one next_target() gives.
+        with self.lock.write():
+            if target is None:
+                target = self.next_target()
+            transactions = self.current_transactions.take(self.max_block_transactions)
+            block = Block(
+                index=len(self.chain) + 1,
+                timestamp=time.time(),
+                transactions=transactions,
+                merkle_root=transactions_root(transactions),
+                target=mining.target_hex(target),
+                proof=proof,
+                previous_hash=previous_hash or self.last_hash,
+            )
+
+            self._append(block, block.hash())
         return block
 
     def new_transaction(self, sender, recipient, amount):
-        self.current_transactions.append({
-            'emisor': sender,
-            'receptor': recipient,
-            'cantidad': amount,
-        })
+        # Resubmitting a pending transaction does not add it twice; returns
+        # None if the transaction does not fit in the mempool at all
+        if self.current_transactions.add(Transaction(sender, recipient, amount)) is None:
+            return None
         return self.last_block['indice'] + 1
 
     @property
     def last_block(self):
         return self.chain[-1]
 
+    @property
+    def last_hash(self):
+        return self.hashes[-1]
+
     @staticmethod
     def hash(block):
-        block_string = json.dumps(block, sort_keys=True).encode()
+        # Only the header is hashed; the transactions are committed to by
+        # the Merkle root in it
+        if isinstance(block, Block):
+            # Always re-serialized: the block may have been edited in place
+            block_string = block.header()
+        else:
+            header = {key: value for key, value in block.items() if key != 'transacciones'}
+            block_string = json.dumps(header, sort_keys=True).encode()
         return hashlib.sha256(block_string).hexdigest()
 
-    def proof_of_work(self, last_proof, last_hash):
-        proof = 0
-        while not self.valid_proof(last_proof, proof, last_hash):
-            proof += 1
+    def proof_of_work(self, last_proof, last_hash, job=None, target=None):
+        # Returns None if the (optional) mining job is cancelled first. By
+        # default the proof is for a block on top of our chain.
+        if target is None:
+            with self.lock.read():
+                target = self.next_target()
+        start = time.perf_counter()
+        if self.workers > 1:
+            proof, tried = self._parallel_miner().search(last_proof, last_hash, target, job)
+        else:
+            proof, tried = mining.search(last_proof, last_hash, target, job=job)
+        if job is not None:
+            job.tried = tried
+
+        elapsed = time.perf_counter() - start
+        self.mining_stats = {
+            'intentos': tried,
+            'segundos': elapsed,
+            'hashes_por_segundo': tried / elapsed if elapsed > 0 else 0.0,
+            'procesos': self.workers,
+        }
         return proof
 
-    def valid_proof(self, last_proof, proof, last_hash):
+    def _parallel_miner(self):
+        if self._miner is None or self._miner.workers != self.workers:
+            if self._miner is not None:
+                self._miner.close()
+            self._miner = ParallelMiner(self.workers)
+        return self._miner
+
+    def valid_proof(self, last_proof, proof, last_hash, target=None):
+        # The hash, read as a number, must be below the target; by default the
+        # easiest one allowed, which is `difficulty` leading zeros
+        if target is None:
+            target = mining.difficulty_target(self.difficulty)
         guess = f"{last_proof}{proof}{last_hash}".encode()
         guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:self.difficulty] == "0" * self.difficulty
+        return int(guess_hash, 16) < target
+
+
+class BlockJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, (Block, Transaction)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 
 # Flask app
 app = Flask(__name__)
+app.json = BlockJSONProvider(app)
 
 # Generate a globally unique address for this node
 node_identifier = str(uuid4()).replace('-', '')
@@ -128,41 +435,147 @@ def index():
         'mensaje': 'Blockchain Educativo - Nodo Activo',
         'nodo_id': node_identifier,
         'bloques': len(blockchain.chain),
-        'endpoints': ['/cadena', '/minar', '/transacciones/nueva', '/nodos/registrar', '/nodos/resolver']
+        'endpoints': ['/cadena', '/cadena/resumen', '/bloques/<indice>', '/minar', '/minar/<id>',
+                      '/transacciones/nueva', '/transacciones/lote', '/transacciones/pendientes',
+                      '/transacciones/prueba/<indice>/<posicion>', '/cuentas/<direccion>',
+                      '/cuentas/<direccion>/historial', '/nodos/registrar', '/nodos/resolver']
     })
 
 
 @app.route('/cadena', methods=['GET'])
 def full_chain():
+    # ?desde=<indice> or ?localizador=<indice:hash,...> return only the
+    # blocks from that point on, ?limite=<n> caps how many are returned
+    with blockchain.lock.read():
+        start = 0
+        if 'localizador' in request.args:
+            start = blockchain.locate(request.args['localizador'])
+        elif 'desde' in request.args:
+            start = max(request.args.get('desde', 1, type=int) - 1, 0)
+
+        length = len(blockchain.chain)
+        stop = length
+        limit = request.args.get('limite', type=int)
+        if limit is not None:
+            stop = min(start + max(limit, 0), length)
+
+        if request.args.get('formato') == 'ndjson':
+            return Response(stream_blocks(start, stop), mimetype='application/x-ndjson')
+        blocks = blockchain.chain[start:stop]
+
     return jsonify({
-        'cadena': blockchain.chain,
-        'longitud': len(blockchain.chain)
+        'cadena': blocks,
+        'longitud': length,
+        'desde': start + 1,
+        # Cursor for the next page: pass it back as ?desde=
+        'siguiente': stop + 1 if stop < length else None,
     })
 
 
-@app.route('/minar', methods=['GET'])
-def mine():
-    last_block = blockchain.last_block
-    last_proof = last_block['proof']
-    last_hash = blockchain.hash(last_block)
+def stream_blocks(start, stop, chunk_size=100):
+    # One JSON document per line, so neither side holds the whole chain.
+    # Blocks are read a chunk at a time under the read lock; if the chain is
+    # replaced between two chunks the stream ends instead of mixing chains.
+    last_hash = None
+    for first in range(start, stop, chunk_size):
+        with blockchain.lock.read():
+            end = min(first + chunk_size, stop, len(blockchain.chain))
+            if end <= first or (last_hash is not None and blockchain.hashes[first - 1] != last_hash):
+                return
+            blocks = blockchain.chain[first:end]
+            last_hash = blockchain.hashes[end - 1]
+        for block in blocks:
+            yield app.json.dumps(block) + '\n'
+
 
-    proof = blockchain.proof_of_work(last_proof, last_hash)
+@app.route('/bloques/<int:indice>', methods=['GET'])
+def get_block(indice):
+    with blockchain.lock.read():
+        if not 1 <= indice <= len(blockchain.chain):
+            return 'Bloque no encontrado', 404
+        block = blockchain.chain[indice - 1]
+    return jsonify(block), 200
 
-    # Reward for mining
-    blockchain.new_transaction(sender="0", recipient=node_identifier, amount=1)
 
-    block = blockchain.new_block(proof, previous_hash=last_hash)
+@app.route('/cadena/resumen', methods=['GET'])
+def chain_summary():
+    return jsonify(blockchain.summary())
+
+
+def mine_block(job=None):
+    with blockchain.lock.read():
+        last_proof = blockchain.last_block['proof']
+        last_hash = blockchain.last_hash
+        target = blockchain.next_target()
+    if job is not None:
+        job.base_hash = last_hash
+
+    proof = blockchain.proof_of_work(last_proof, last_hash, job, target)
+    if proof is None:
+        return None
+
+    # Checking the tip and appending the block must not be split by a
+    # chain replacement or another miner
+    with blockchain.lock.write():
+        if blockchain.last_hash != last_hash:
+            # The tip moved (e.g. resolve_conflicts) while we were mining
+            if job is not None:
+                job.finish('reemplazado')
+            return None
+
+        # Reward for mining, always at the front of the block's batch
+        blockchain.current_transactions.add(Transaction(sender="0", recipient=node_identifier, amount=1),
+                                            first=True)
+
+        return blockchain.new_block(proof, previous_hash=last_hash, target=target)
+
+
+mining_jobs = MiningScheduler(mine_block)
+
+
+@app.route('/minar', methods=['GET'])
+def mine():
+    block = mine_block()
+    if block is None:
+        return jsonify({'mensaje': 'La cadena cambió durante el minado, intente de nuevo'}), 409
 
     response = {
         'mensaje': 'Nuevo bloque minado',
         'indice': block['indice'],
         'transacciones': block['transacciones'],
+        'merkle_root': block['merkle_root'],
+        'objetivo': block['objetivo'],
         'proof': block['proof'],
-        'previous_hash': block['previous_hash']
+        'previous_hash': block['previous_hash'],
+        'hashes_por_segundo': blockchain.mining_stats['hashes_por_segundo'],
     }
     return jsonify(response), 200
 
 
+@app.route('/minar', methods=['POST'])
+def start_mining():
+    job = mining_jobs.submit()
+    response = job.to_dict()
+    response['mensaje'] = 'Minado iniciado'
+    return jsonify(response), 202
+
+
+@app.route('/minar/<job_id>', methods=['GET'])
+def mining_status(job_id):
+    job = mining_jobs.get(job_id)
+    if job is None:
+        return 'Trabajo de minado no encontrado', 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/minar/<job_id>', methods=['DELETE'])
+def cancel_mining(job_id):
+    job = mining_jobs.cancel(job_id)
+    if job is None:
+        return 'Trabajo de minado no encontrado', 404
+    return jsonify(job.to_dict()), 200
+
+
 @app.route('/transacciones/nueva', methods=['POST'])
 def new_transaction():
     values = request.get_json()
@@ -171,9 +584,140 @@ def new_transaction():
         return 'Faltan valores', 400
 
     index = blockchain.new_transaction(values['emisor'], values['receptor'], values['cantidad'])
+    if index is None:
+        return 'Transacción demasiado grande', 413
     return jsonify({'mensaje': f'Transacción será añadida al bloque {index}'}), 201
 
 
+@app.route('/transacciones/lote', methods=['POST'])
+def new_transactions_batch():
+    # A JSON array of transactions, or NDJSON with one per line. Every item
+    # is checked first and the batch is only added if all of them are valid
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            values = [json.loads(line) for line in request.get_data().splitlines() if line.strip()]
+        except ValueError:
+            return 'NDJSON inválido', 400
+    else:
+        values = request.get_json(silent=True)
+    if not isinstance(values, list) or not values:
+        return 'Se esperaba una lista de transacciones', 400
+
+    mempool = blockchain.current_transactions
+    if len(values) > mempool.max_transactions:
+        return 'Lote demasiado grande', 413
+
+    required = ['emisor', 'receptor', 'cantidad']
+    transactions = []
+    results = []
+    for position, item in enumerate(values):
+        result = {'posicion': position}
+        results.append(result)
+        if not isinstance(item, dict) or not all(k in item for k in required):
+            result['error'] = 'Faltan valores'
+            continue
+        tx = Transaction(item['emisor'], item['receptor'], item['cantidad'])
+        if len(tx.canonical()) > mempool.max_bytes:
+            result['error'] = 'Transacción demasiado grande'
+            continue
+        transactions.append(tx)
+
+    if len(transactions) < len(values):
+        for result in results:
+            result['estado'] = 'invalida' if 'error' in result else 'valida'
+        return jsonify({'mensaje': 'Lote rechazado, no se añadió ninguna transacción',
+                        'resultados': results}), 400
+
+    for result, (txid, added) in zip(results, mempool.add_many(transactions)):
+        result['id'] = txid
+        result['estado'] = 'aceptada' if added else 'duplicada'
+    accepted = sum(result['estado'] == 'aceptada' for result in results)
+    return jsonify({
+        'mensaje': f'{accepted} transacciones serán añadidas a partir del bloque {blockchain.last_block["indice"] + 1}',
+        'aceptadas': accepted,
+        'duplicadas': len(results) - accepted,
+        'resultados': results,
+    }), 201
+
+
+@app.route('/transacciones/pendientes', methods=['GET'])
+def pending_transactions():
+    # ?emisor=<direccion> lists only that sender's pending transactions
+    mempool = blockchain.current_transactions
+    if 'emisor' in request.args:
+        transactions = mempool.by_sender(request.args['emisor'])
+    else:
+        transactions = list(mempool)
+    return jsonify({
+        'transacciones': transactions,
+        'pendientes': len(mempool),
+        'bytes': mempool.size,
+        'descartadas': mempool.evicted,
+        'max_por_bloque': blockchain.max_block_transactions,
+    }), 200
+
+
+@app.route('/transacciones/prueba/<int:indice>/<int:posicion>', methods=['GET'])
+def transaction_proof(indice, posicion):
+    # Merkle inclusion proof of one transaction, verifiable with only the
+    # block header (see merkle.verify_proof)
+    with blockchain.lock.read():
+        if not 1 <= indice <= len(blockchain.chain):
+            return 'Bloque no encontrado', 404
+        block = blockchain.chain[indice - 1]
+        block_hash = blockchain.hashes[indice - 1]
+    if not 0 <= posicion < len(block['transacciones']):
+        return 'Transacción no encontrada', 404
+
+    header = {key: value for key, value in block.to_dict().items() if key != 'transacciones'}
+    return jsonify({
+        'transaccion': block['transacciones'][posicion],
+        'posicion': posicion,
+        'cabecera': header,
+        'hash_bloque': block_hash,
+        'merkle_root': block['merkle_root'],
+        'prueba': block.merkle_proof(posicion),
+    }), 200
+
+
+@app.route('/cuentas/<direccion>', methods=['GET'])
+def account(direccion):
+    with blockchain.lock.read():
+        balance = blockchain.accounts.balance(direccion)
+        count = blockchain.accounts.count(direccion)
+    return jsonify({
+        'direccion': direccion,
+        'saldo': balance,
+        'transacciones': count,
+    }), 200
+
+
+@app.route('/cuentas/<direccion>/historial', methods=['GET'])
+def account_history(direccion):
+    # Oldest first; ?desde=<n> skips the first n entries, ?limite=<n> caps
+    # the page (100 by default) and `siguiente` is the next value of desde
+    start = max(request.args.get('desde', 0, type=int), 0)
+    limit = min(max(request.args.get('limite', 100, type=int), 0), 1000)
+    history = []
+    with blockchain.lock.read():
+        total = blockchain.accounts.count(direccion)
+        for index, position in blockchain.accounts.references(direccion, start, start + limit):
+            history.append({
+                'bloque': index,
+                'posicion': position,
+                'transaccion': blockchain.chain[index - 1]['transacciones'][position],
+            })
+
+    stop = start + len(history)
+    return jsonify({
+        'direccion': direccion,
+        'historial': history,
+        'total': total,
+        'desde': start,
+        'siguiente': stop if stop < total else None,
+    }), 200
+
+
 @app.route('/nodos/registrar', methods=['POST'])
 def register_nodes():
     values = request.get_json()
@@ -190,10 +734,16 @@ def register_nodes():
 @app.route('/nodos/resolver', methods=['GET'])
 def consensus():
     replaced = blockchain.resolve_conflicts()
+    with blockchain.lock.read():
+        chain = blockchain.chain[:]
+        last_hash = blockchain.last_hash
     if replaced:
-        return jsonify({'mensaje': 'Cadena reemplazada', 'nueva_cadena': blockchain.chain}), 200
+        mining_jobs.supersede(last_hash)
+        return jsonify({'mensaje': 'Cadena reemplazada', 'nueva_cadena': chain,
+                        'latencias': blockchain.peer_latency}), 200
     else:
-        return jsonify({'mensaje': 'Cadena autoritativa', 'cadena': blockchain.chain}), 200
+        return jsonify({'mensaje': 'Cadena autoritativa', 'cadena': chain,
+                        'latencias': blockchain.peer_latency}), 200
 
 
 if __name__ == '__main__':
@@ -201,6 +751,17 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
     parser.add_argument('-p', '--port', default=5000, type=int, help='port to listen on')
+    parser.add_argument('-w', '--workers', default=1, type=int, help='processes used for mining')
+    parser.add_argument('--data-dir', help='keep the chain in an append-only block log in this directory')
+    parser.add_argument('--sqlite', help='keep the chain in this SQLite database instead')
+    parser.add_argument('--window', default=1000, type=int,
+                        help='recent blocks kept in memory when a store is used')
     args = parser.parse_args()
 
+    if args.data_dir:
+        blockchain = Blockchain(storage=SegmentLogStorage(args.data_dir), window=args.window)
+    elif args.sqlite:
+        blockchain = Blockchain(storage=SQLiteStorage(args.sqlite), window=args.window)
+    blockchain.workers = args.workers
+
     app.run(host='0.0.0.0', port=args.port)
\ No newline at end of file
@@ -35,20 +35,16 @@ def nivel1():
     print('Objetivo: Entender que una Blockchain es una lista enlazada de bloques.')
     
     try:
-        resp = requests.get(f'{API}/cadena', timeout=3)
-        resp.raise_for_status()
-        data = resp.json()
-        print(f'\nCadena descargada. Longitud actual: {len(data["cadena"])}')
-        
-        for b in data['cadena']:
-            print('\n' + '=' * 40)
-            print(f"Bloque {b['indice']}")
-            print(f"Timestamp: {time.ctime(b['timestamp'])}")
-            print(f"Transacciones: {len(b['transacciones'])}")
-            print(f"Proof (Prueba de Trabajo): {b['proof']}")
-            print(f"Previous Hash (Hash del Bloque Anterior): {b['previous_hash']}")
-            print('=' * 40)
-            print('Concepto Clave: El `previous_hash` es el enlace criptográfico que garantiza el orden y la integridad')
+        # La cadena se lee por páginas para no descargarla entera de una vez
+        desde = 1
+        while desde is not None:
+            resp = requests.get(f'{API}/cadena', params={'desde': desde, 'limite': 20}, timeout=3)
+            resp.raise_for_status()
+            data = resp.json()
+            if desde == 1:
+                print(f'\nLongitud actual de la cadena: {data["longitud"]}')
+            mostrar_bloques(data['cadena'])
+            desde = data.get('siguiente')
         
     except requests.RequestException:
         print('\nError: No se pudo conectar al servidor. Asegúrese de que esté activo.')
@@ -56,6 +52,18 @@ def nivel1():
     wait_for_continue()
 
 
+def mostrar_bloques(bloques):
+    for b in bloques:
+        print('\n' + '=' * 40)
+        print(f"Bloque {b['indice']}")
+        print(f"Timestamp: {time.ctime(b['timestamp'])}")
+        print(f"Transacciones: {len(b['transacciones'])}")
+        print(f"Proof (Prueba de Trabajo): {b['proof']}")
+        print(f"Previous Hash (Hash del Bloque Anterior): {b['previous_hash']}")
+        print('=' * 40)
+        print('Concepto Clave: El `previous_hash` es el enlace criptográfico que garantiza el orden y la integridad')
+
+
 def nivel2():
     clear_screen()
     print('\n--- Nivel 2: Transacciones (Creación y Estado) ---')
@@ -96,18 +104,31 @@ def nivel3():
     
     try:
         print('\nIniciando minado... el servidor está buscando un número ("nonce") cuyo hash cumpla la dificultad (ej: inicie con varios ceros). Esto puede tardar varios segundos.')
-        resp = requests.get(f'{API}/minar', timeout=60)
+        resp = requests.post(f'{API}/minar', timeout=3)
         resp.raise_for_status()
-        
-        respuesta = resp.json()
-        print('\n--- Bloque Minado con Éxito ---')
-        print(f"Mensaje: {respuesta.get('mensaje')}")
-        print(f"Número de Bloque: {respuesta.get('indice_nuevo')}")
-        print(f"Proof encontrado: {respuesta.get('proof')}")
-        print('Concepto Clave: El minero recibe una recompensa por el esfuerzo computacional que verifica la red. Esto incentiva la seguridad y la creación de bloques.')
-        
-    except requests.exceptions.Timeout:
-        print('\nEl minado ha excedido el tiempo de espera. La Prueba de Trabajo puede ser muy difícil.')
+        trabajo = resp.json()
+
+        # El servidor mina en segundo plano; consultamos el progreso
+        limite = time.time() + 120
+        while trabajo['estado'] in ('en_cola', 'minando') and time.time() < limite:
+            time.sleep(0.5)
+            resp = requests.get(f"{API}/minar/{trabajo['id']}", timeout=3)
+            resp.raise_for_status()
+            trabajo = resp.json()
+            print(f"  Nonces probados: {trabajo['intentos']} ({trabajo['hashes_por_segundo']:.0f} hashes/s)")
+
+        if trabajo['estado'] != 'completado':
+            if trabajo['estado'] in ('en_cola', 'minando'):
+                requests.delete(f"{API}/minar/{trabajo['id']}", timeout=3)
+            print(f"\nEl minado no terminó (estado: {trabajo['estado']}). La Prueba de Trabajo puede ser muy difícil.")
+        else:
+            bloque = trabajo['bloque']
+            print('\n--- Bloque Minado con Éxito ---')
+            print(f"Número de Bloque: {bloque['indice']}")
+            print(f"Proof encontrado: {bloque['proof']}")
+            print(f"Tiempo de minado: {trabajo['segundos']:.2f} s")
+            print('Concepto Clave: El minero recibe una recompensa por el esfuerzo computacional que verifica la red. Esto incentiva la seguridad y la creación de bloques.')
+
     except requests.RequestException:
         print('\nError: No se pudo contactar al servidor o el minado falló.')
         
@@ -120,20 +141,20 @@ def nivel4():
     print('Objetivo: Entender que la Inmutabilidad se logra porque cualquier alteración en el bloque cambia su hash, invalidando todos los bloques siguientes.')
     
     try:
-        print('\nDescargando cadena para inspección...')
-        resp = requests.get(f'{API}/cadena', timeout=3)
+        print('\nDescargando los dos primeros bloques para inspección...')
+        resp = requests.get(f'{API}/bloques/1', timeout=3)
         resp.raise_for_status()
-        data = resp.json()
+        genesis = resp.json()
         
         print('\n--- Inspección del Primer Bloque (Génesis) ---')
-        genesis = data['cadena'][0]
         print(f"Índice: {genesis['indice']}")
         print(f"Timestamp: {time.ctime(genesis['timestamp'])}")
         print(f"Transacciones: {genesis['transacciones']}")
         
-        if len(data['cadena']) > 1:
+        resp = requests.get(f'{API}/bloques/2', timeout=3)
+        if resp.status_code == 200:
             print('\n--- Inspección del Segundo Bloque ---')
-            segundo = data['cadena'][1]
+            segundo = resp.json()
             print(f"Hash anterior (previous_hash): {segundo['previous_hash']}")
             print('Concepto Clave: Este hash debe coincidir exactamente con el hash calculado del bloque anterior (génesis).')
             print('Si se intentara cambiar un dato en el Bloque 1, su hash cambiaría, y el Bloque 2 se volvería inválido, rompiendo la cadena.')
@@ -0,0 +1,71 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """Readers/writer lock: many readers at once, or a single writer.
+
+    Waiting writers go before new readers so a steady stream of reads cannot
+    starve them. Both sides are reentrant for the thread that holds them, and
+    the writer may also take the read side; a reader cannot upgrade to write.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None  # ident of the thread holding the write side
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self):
+        return getattr(self._local, 'depth', 0)
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                if not self._read_depth():
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                    self._readers += 1
+                self._local.depth = self._read_depth() + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if self._writer == me:
+                    self._writer_depth -= 1
+                else:
+                    self._local.depth -= 1
+                    if not self._local.depth:
+                        self._readers -= 1
+                        if not self._readers:
+                            self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                if self._read_depth():
+                    raise RuntimeError('cannot take the write lock while holding the read lock')
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
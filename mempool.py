@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import merkle
+from block import address_key, canonical_transaction
+
+
+def transaction_id(tx):
+    # Same hash as the transaction's Merkle leaf
+    return merkle.leaf_hash(canonical_transaction(tx)).hex()
+
+
+class Mempool:
+    """Pending transactions in arrival order, indexed by id and by sender.
+
+    Adding a transaction that is already pending is a no-op. When the pool
+    goes over `max_transactions` or `max_bytes` (of canonical JSON) the
+    oldest transactions are evicted first.
+    """
+
+    def __init__(self, max_transactions=50000, max_bytes=16 * 1024 * 1024):
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self.size = 0  # bytes of canonical JSON held
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._transactions = OrderedDict()  # txid -> transaction
+        self._by_sender = {}  # sender -> {txid: None}, in arrival order
+
+    def __len__(self):
+        return len(self._transactions)
+
+    def __iter__(self):
+        return iter(list(self._transactions.values()))
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('transaction index out of range')
+        return next(islice(self._transactions.values(), position, None))
+
+    def __contains__(self, txid):
+        return txid in self._transactions
+
+    def get(self, txid):
+        return self._transactions.get(txid)
+
+    def by_sender(self, sender):
+        with self._lock:
+            return [self._transactions[txid] for txid in self._by_sender.get(address_key(sender), ())]
+
+    def add(self, tx, first=False):
+        """Add `tx` and return its id, or None if it is larger than the whole pool.
+
+        With `first` the transaction goes to the front, so it is the first one
+        taken for the next block (the mining reward).
+        """
+        if len(canonical_transaction(tx)) > self.max_bytes:
+            return None
+
+        with self._lock:
+            txid, _ = self._insert(tx)
+            if first:
+                self._transactions.move_to_end(txid, last=False)
+            self._evict(keep=txid if first else None)
+        return txid
+
+    def add_many(self, transactions):
+        """Add a batch in one step and return (txid, added) for each transaction.
+
+        `added` is False for transactions that were already pending. The
+        caller checks sizes first: nothing here rejects a transaction, so
+        either the whole batch goes in or, on error, none of it.
+        """
+        with self._lock:
+            results = [self._insert(tx) for tx in transactions]
+            self._evict()
+        return results
+
+    def _insert(self, tx):
+        txid = transaction_id(tx)
+        if txid in self._transactions:
+            return txid, False
+        self._transactions[txid] = tx
+        self._by_sender.setdefault(address_key(tx['emisor']), {})[txid] = None
+        self.size += len(canonical_transaction(tx))
+        return txid, True
+
+    def _evict(self, keep=None):
+        while len(self._transactions) > self.max_transactions or self.size > self.max_bytes:
+            oldest = next(iter(self._transactions))
+            if oldest == keep:
+                # Never evict the transaction that was just put in front
+                oldest = next(islice(self._transactions, 1, None))
+            self._remove(oldest)
+            self.evicted += 1
+
+    def take(self, count):
+        # Remove and return the `count` oldest transactions
+        with self._lock:
+            batch = list(islice(self._transactions, count))
+            return [self._remove(txid) for txid in batch]
+
+    def _remove(self, txid):
+        tx = self._transactions.pop(txid)
+        self.size -= len(canonical_transaction(tx))
+        key = address_key(tx['emisor'])
+        sender = self._by_sender[key]
+        del sender[txid]
+        if not sender:
+            del self._by_sender[key]
+        return tx
@@ -0,0 +1,64 @@
+import hashlib
+import json
+
+# Leaves and inner nodes are hashed with different prefixes so an inner node
+# can never be passed off as a transaction (RFC 6962 style)
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+EMPTY_ROOT = hashlib.sha256(b'').hexdigest()
+
+
+def leaf_hash(data):
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves):
+    """All tree levels from the leaf hashes up to the root, as raw digests.
+
+    An unpaired node at the end of a level is promoted unchanged instead of
+    being paired with a copy of itself, so two different transaction lists
+    can never share a root.
+    """
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def root(levels):
+    if not levels[-1]:
+        return EMPTY_ROOT
+    return levels[-1][0].hex()
+
+
+def proof(levels, position):
+    # Sibling hashes from the leaf up, each with the side it sits on
+    steps = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            steps.append({'hash': level[sibling].hex(),
+                          'lado': 'izquierda' if sibling < position else 'derecha'})
+        position //= 2
+    return steps
+
+
+def verify_proof(transaction, steps, merkle_root):
+    """Check an inclusion proof for a transaction given as its wire dict."""
+    current = leaf_hash(json.dumps(transaction, sort_keys=True).encode())
+    for step in steps:
+        sibling = bytes.fromhex(step['hash'])
+        if step['lado'] == 'izquierda':
+            current = node_hash(sibling, current)
+        else:
+            current = node_hash(current, sibling)
+    return current.hex() == merkle_root
@@ -0,0 +1,271 @@
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from uuid import uuid4
+
+# Sentinel stored in the shared "found" slot while no proof has been found
+NO_PROOF = 2 ** 63 - 1
+
+# How many nonces a worker checks between looks at the shared state
+CHECK_EVERY = 4096
+
+_generation = None
+_found = None
+
+
+# Largest target a block can record (64 hex digits)
+MAX_TARGET = 2 ** 256 - 1
+
+
+def difficulty_target(difficulty):
+    # A hex digest starts with `difficulty` zeros exactly when the digest, as
+    # a number, is below 16 ** (64 - difficulty)
+    if difficulty <= 0:
+        return MAX_TARGET
+    if difficulty > 64:
+        return 0
+    return 16 ** (64 - difficulty)
+
+
+def target_bytes(target):
+    # Comparing a raw digest with these bytes is the numeric comparison
+    # digest < target, as long as both have the same length
+    return min(target, MAX_TARGET).to_bytes(32, 'big')
+
+
+def target_hex(target):
+    return format(min(target, MAX_TARGET), '064x')
+
+
+def block_work(target):
+    # Expected number of hashes needed to get below `target`
+    return 2 ** 256 // (target + 1)
+
+
+def retarget(target, elapsed, expected, max_target):
+    """Scale `target` by how long the last period took against how long it should have.
+
+    The adjustment is clamped to a factor of 4 either way, and the result
+    never goes above `max_target` (the minimum difficulty).
+    """
+    elapsed = min(max(elapsed, expected / 4), expected * 4)
+    # Milliseconds keep the arithmetic on integers
+    new_target = target * int(elapsed * 1000) // int(expected * 1000)
+    return max(min(new_target, max_target), 1)
+
+
+def _init_worker(generation, found):
+    global _generation, _found
+    _generation = generation
+    _found = found
+
+
+def search_range(last_proof, last_hash, target, start, stop, generation=None):
+    """Return (smallest valid proof in [start, stop) or None, nonces tried).
+
+    Equivalent to testing Blockchain.valid_proof for each nonce: the hash
+    state for str(last_proof) is computed once and copied per nonce, and the
+    raw digest is compared with the target instead of parsing the hex string.
+    """
+    target = target_bytes(target)
+    prefix = hashlib.sha256(str(last_proof).encode())
+    suffix = last_hash.encode()
+    copy = prefix.copy
+    proof = start
+    while proof < stop:
+        if generation is not None and (_generation.value != generation or _found.value <= proof):
+            # Another job started or a smaller proof is already known
+            break
+        batch_stop = min(proof + CHECK_EVERY, stop)
+        for nonce in range(proof, batch_stop):
+            h = copy()
+            h.update(b'%d' % nonce)
+            h.update(suffix)
+            if h.digest() < target:
+                if generation is not None and nonce < _found.value:
+                    _found.value = nonce
+                return nonce, nonce - start + 1
+        proof = batch_stop
+    return None, proof - start
+
+
+def search(last_proof, last_hash, target, chunk_size=50000, job=None):
+    """Serial search from nonce 0; returns (smallest valid proof, nonces tried).
+
+    The proof is None when `job` gets cancelled before a proof is found.
+    """
+    start = 0
+    while True:
+        if job is not None:
+            job.tried = start
+            if job.cancelled.is_set():
+                return None, start
+        proof, tried = search_range(last_proof, last_hash, target, start, start + chunk_size)
+        if proof is not None:
+            return proof, start + tried
+        start += chunk_size
+
+
+class ParallelMiner:
+    def __init__(self, workers, chunk_size=50000):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._generation = None
+        self._found = None
+
+    def _pool(self):
+        if self._executor is None:
+            ctx = multiprocessing.get_context()
+            self._generation = ctx.RawValue('q', 0)
+            self._found = ctx.RawValue('q', NO_PROOF)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self._generation, self._found),
+            )
+        return self._executor
+
+    def search(self, last_proof, last_hash, target, job=None):
+        """Return (smallest valid proof, nonces tried); the proof is None if `job` is cancelled."""
+        executor = self._pool()
+        self._generation.value += 1
+        generation = self._generation.value
+        self._found.value = NO_PROOF
+
+        # Chunks are consumed in nonce order, so the first chunk that reports a
+        # proof holds the smallest one: every chunk before it came back empty.
+        pending = deque()
+        next_start = 0
+        tried = 0
+        for _ in range(self.workers * 2):
+            pending.append(executor.submit(
+                search_range, last_proof, last_hash, target,
+                next_start, next_start + self.chunk_size, generation))
+            next_start += self.chunk_size
+
+        while True:
+            proof, count = pending.popleft().result()
+            tried += count
+            if proof is not None:
+                break
+            if job is not None:
+                job.tried = tried
+                if job.cancelled.is_set():
+                    # Bumping the generation makes every running chunk give up
+                    self._generation.value += 1
+                    return None, tried
+            pending.append(executor.submit(
+                search_range, last_proof, last_hash, target,
+                next_start, next_start + self.chunk_size, generation))
+            next_start += self.chunk_size
+
+        # Chunks still running see the found proof and stop early
+        self._found.value = proof
+        return proof, tried
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+
+class MiningJob:
+    def __init__(self):
+        self.id = uuid4().hex
+        self.status = 'en_cola'
+        self.tried = 0
+        self.started = None
+        self.finished = None
+        self.base_hash = None  # chain tip the job is mining on top of
+        self.block = None
+        self.cancelled = threading.Event()
+
+    def finish(self, status, block=None):
+        self.status = status
+        self.block = block
+        self.finished = time.time()
+
+    def to_dict(self):
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or time.time()) - self.started
+        return {
+            'id': self.id,
+            'estado': self.status,
+            'intentos': self.tried,
+            'segundos': elapsed,
+            'hashes_por_segundo': self.tried / elapsed if elapsed > 0 else 0.0,
+            'base_hash': self.base_hash,
+            'bloque': self.block,
+        }
+
+
+class MiningScheduler:
+    """Runs mining jobs one at a time on a background thread.
+
+    `mine(job)` must return the new block, or None when the job was cancelled
+    or superseded (it is expected to update job.status itself in that case).
+    """
+
+    def __init__(self, mine, max_jobs=100):
+        self._mine = mine
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='minado')
+
+    def submit(self):
+        job = MiningJob()
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_finished()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _forget_finished(self):
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].finished is not None:
+                del self.jobs[job_id]
+
+    def _run(self, job):
+        if job.cancelled.is_set():
+            return
+        job.status = 'minando'
+        job.started = time.time()
+        try:
+            block = self._mine(job)
+        except Exception:
+            job.finish('error')
+            raise
+        if block is not None:
+            job.finish('completado', block)
+        elif job.finished is None:
+            job.finish('cancelado')
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished is not None:
+            return job
+        job.cancelled.set()
+        if job.status == 'en_cola':
+            job.finish('cancelado')
+        return job
+
+    def supersede(self, tip_hash):
+        """Stop running jobs that are not mining on top of `tip_hash`."""
+        for job in list(self.jobs.values()):
+            if job.status == 'minando' and job.base_hash not in (None, tip_hash):
+                job.finish('reemplazado')
+                job.cancelled.set()
@@ -0,0 +1,333 @@
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict, deque
+
+# Index record: segment number, offset in the segment, length, raw block hash
+INDEX_RECORD = struct.Struct('<IQI32s')
+
+
+class _MappedFile:
+    """Read-only mmap of a file that keeps growing; remapped on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def read(self, offset, length):
+        if self._map is None or offset + length > len(self._map):
+            self._remap()
+        return self._map[offset:offset + length]
+
+    def _remap(self):
+        self.close()
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+
+class SegmentLogStorage:
+    """Append-only block log split into segment files, plus a fixed-width index.
+
+    Each block is written to the current segment and then described by one
+    INDEX_RECORD in index.bin, so opening the log only needs the index: the
+    block hashes live there and blocks are read back through mmap by position.
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, fsync=True):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._segments = {}
+        os.makedirs(directory, exist_ok=True)
+
+        self._index_path = os.path.join(directory, 'index.bin')
+        self._index = open(self._index_path, 'ab+')
+        self._count = 0
+        self._recover()
+        self._index_map = _MappedFile(self._index_path)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'segment-{number:06d}.log')
+
+    def _recover(self):
+        # A crash can leave a partial index record, index records pointing past
+        # the data that reached the disk, or data that was never indexed
+        size = os.path.getsize(self._index_path)
+        count = size // INDEX_RECORD.size
+        while count:
+            self._index.seek((count - 1) * INDEX_RECORD.size)
+            segment, offset, length, _ = INDEX_RECORD.unpack(self._index.read(INDEX_RECORD.size))
+            path = self._segment_path(segment)
+            if os.path.exists(path) and os.path.getsize(path) >= offset + length:
+                break
+            count -= 1
+
+        self._count = count
+        if count:
+            self._index.seek((count - 1) * INDEX_RECORD.size)
+            segment, offset, length, _ = INDEX_RECORD.unpack(self._index.read(INDEX_RECORD.size))
+            self._segment, self._segment_end = segment, offset + length
+        else:
+            self._segment, self._segment_end = 0, 0
+        self._truncate_files()
+
+    def _truncate_files(self):
+        # Mapped regions must go before the files shrink under them
+        self._close_segment(self._segment)
+        self._index.truncate(self._count * INDEX_RECORD.size)
+        for name in os.listdir(self.directory):
+            if name.startswith('segment-') and name.endswith('.log'):
+                number = int(name[len('segment-'):-len('.log')])
+                if number > self._segment:
+                    self._close_segment(number)
+                    os.remove(os.path.join(self.directory, name))
+        with open(self._segment_path(self._segment), 'ab') as segment:
+            segment.truncate(self._segment_end)
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        start = position * INDEX_RECORD.size
+        return INDEX_RECORD.unpack(self._index_map.read(start, INDEX_RECORD.size))
+
+    def read(self, position):
+        with self._lock:
+            segment, offset, length, _ = self._record(position)
+            mapped = self._segments.get(segment)
+            if mapped is None:
+                mapped = self._segments[segment] = _MappedFile(self._segment_path(segment))
+            return mapped.read(offset, length)
+
+    def hash_at(self, position):
+        with self._lock:
+            return self._record(position)[3].hex()
+
+    def hashes(self):
+        # All block hashes in order, straight from the index
+        with self._lock:
+            if not self._count:
+                return []
+            data = self._index_map.read(0, self._count * INDEX_RECORD.size)
+        return [record[3].hex() for record in INDEX_RECORD.iter_unpack(data)]
+
+    def append(self, data, block_hash):
+        with self._lock:
+            if self._segment_end and self._segment_end + len(data) > self.segment_size:
+                self._segment += 1
+                self._segment_end = 0
+
+            with open(self._segment_path(self._segment), 'ab') as segment:
+                segment.write(data)
+                self._sync(segment)
+
+            self._index.seek(0, os.SEEK_END)
+            self._index.write(INDEX_RECORD.pack(self._segment, self._segment_end, len(data),
+                                                bytes.fromhex(block_hash)))
+            self._sync(self._index)
+            self._segment_end += len(data)
+            self._count += 1
+
+    def truncate(self, length):
+        # Drop every block from position `length` on
+        with self._lock:
+            if length >= self._count:
+                return
+            self._count = length
+            if length:
+                segment, offset, size, _ = self._record(length - 1)
+                self._segment, self._segment_end = segment, offset + size
+            else:
+                self._segment, self._segment_end = 0, 0
+            self._index_map.close()
+            self._truncate_files()
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _close_segment(self, number):
+        mapped = self._segments.pop(number, None)
+        if mapped is not None:
+            mapped.close()
+
+    def close(self):
+        for number in list(self._segments):
+            self._close_segment(number)
+        self._index_map.close()
+        self._index.close()
+
+
+class SQLiteStorage:
+    """Same interface as SegmentLogStorage, backed by a single SQLite file."""
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute('CREATE TABLE IF NOT EXISTS bloques '
+                         '(posicion INTEGER PRIMARY KEY, hash BLOB NOT NULL, datos BLOB NOT NULL)')
+        self._db.commit()
+        self._count = self._db.execute('SELECT COUNT(*) FROM bloques').fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def _row(self, column, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        with self._lock:
+            return self._db.execute(f'SELECT {column} FROM bloques WHERE posicion = ?',
+                                    (position,)).fetchone()[0]
+
+    def read(self, position):
+        return self._row('datos', position)
+
+    def hash_at(self, position):
+        return self._row('hash', position).hex()
+
+    def hashes(self):
+        with self._lock:
+            rows = self._db.execute('SELECT hash FROM bloques ORDER BY posicion').fetchall()
+        return [row[0].hex() for row in rows]
+
+    def append(self, data, block_hash):
+        with self._lock:
+            self._db.execute('INSERT INTO bloques VALUES (?, ?, ?)',
+                             (self._count, bytes.fromhex(block_hash), data))
+            self._db.commit()
+            self._count += 1
+
+    def truncate(self, length):
+        with self._lock:
+            if length >= self._count:
+                return
+            self._db.execute('DELETE FROM bloques WHERE posicion >= ?', (length,))
+            self._db.commit()
+            self._count = length
+
+    def close(self):
+        self._db.close()
+
+
+def encode_block(block):
+    return json.dumps(block, sort_keys=True).encode()
+
+
+def decode_block(data):
+    return json.loads(bytes(data))
+
+
+class StoredHashes:
+    """Read-only sequence of block hashes served from a store's index."""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __len__(self):
+        return len(self.storage)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.storage.hash_at(p) for p in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.storage.hash_at(index)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.storage.hash_at(position)
+
+
+class StoredChain:
+    """List-like chain backed by a store.
+
+    Only the last `window` blocks are kept in memory; older blocks are read
+    from the store when indexed and kept in an LRU cache of `cache_size`
+    entries. Slices and iteration stream from the store without filling the
+    cache, so a full scan does not evict the blocks that are in use.
+
+    Concurrent readers are safe; appending or truncating must not overlap
+    with reads (Blockchain.lock takes care of that).
+    """
+
+    def __init__(self, storage, window=1000, cache_size=1000, encode=encode_block, decode=decode_block):
+        self.storage = storage
+        self.window = window
+        self.cache_size = cache_size
+        self.hashes = StoredHashes(storage)
+        self._encode = encode
+        self._decode = decode
+        self._recent = deque()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # readers share the LRU order
+        for position in range(max(len(storage) - window, 0), len(storage)):
+            self._recent.append(self._read(position))
+
+    def __len__(self):
+        return len(self.storage)
+
+    def _read(self, position):
+        return self._decode(self.storage.read(position))
+
+    def _get(self, position, cache=True):
+        first_recent = len(self) - len(self._recent)
+        if position >= first_recent:
+            return self._recent[position - first_recent]
+
+        with self._cache_lock:
+            block = self._cache.get(position)
+            if block is not None:
+                self._cache.move_to_end(position)
+                return block
+
+        block = self._read(position)
+        if cache:
+            with self._cache_lock:
+                self._cache[position] = block
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return block
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(p, cache=False) for p in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('block index out of range')
+        return self._get(index)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self._get(position, cache=False)
+
+    def append(self, block, block_hash):
+        self.storage.append(self._encode(block), block_hash)
+        self._recent.append(block)
+        if len(self._recent) > self.window:
+            self._recent.popleft()
+
+    def truncate(self, length):
+        dropped = len(self) - length
+        if dropped <= 0:
+            return
+        self.storage.truncate(length)
+        for _ in range(min(dropped, len(self._recent))):
+            self._recent.pop()
+        for position in [p for p in self._cache if p >= length]:
+            del self._cache[position]
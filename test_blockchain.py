@@ -1,10 +1,73 @@
 import unittest
 import json
+import threading
 import time
-from blockchain import Blockchain
+from unittest import mock
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+from block import Block, Transaction
+from blockchain import Blockchain, BlockJSONProvider, app, mining_jobs
+from blockchain import blockchain as node
+from accounts import AccountIndex
+from locks import RWLock
+from mempool import Mempool
+import merkle
+import mining
+from mining import ParallelMiner
 from urllib.parse import urlparse
 
 
+def serve_node(blockchain, delay=0):
+    """Levanta un nodo de reemplazo local que sirve la cadena de `blockchain`"""
+    stand_in = Flask(__name__)
+    stand_in.json = BlockJSONProvider(stand_in)
+    stand_in.hits = []
+    stand_in.sent = []
+
+    @stand_in.before_request
+    def count():
+        stand_in.hits.append(request.path)
+
+    @stand_in.route('/cadena')
+    def cadena():
+        time.sleep(delay)
+        start = 0
+        if 'localizador' in request.args:
+            start = blockchain.locate(request.args['localizador'])
+        stand_in.sent.append(len(blockchain.chain) - start)
+        return jsonify({'cadena': blockchain.chain[start:], 'longitud': len(blockchain.chain),
+                        'desde': start + 1})
+
+    @stand_in.route('/cadena/resumen')
+    def resumen():
+        time.sleep(delay)
+        return jsonify(blockchain.summary())
+
+    server = make_server('127.0.0.1', 0, stand_in, threaded=True)
+    server.hits = stand_in.hits
+    server.sent = stand_in.sent
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def mine_blocks(blockchain, count):
+    """Mina `count` bloques válidos sobre la punta de `blockchain`"""
+    for i in range(count):
+        last_block = blockchain.last_block
+        last_hash = blockchain.hash(last_block)
+        proof = blockchain.proof_of_work(last_block['proof'], last_hash)
+        blockchain.new_block(proof, last_hash)
+
+
+def fork(blockchain, length):
+    """Crea una blockchain que comparte los primeros `length` bloques"""
+    other = Blockchain()
+    other.difficulty = blockchain.difficulty
+    other.chain = list(blockchain.chain[:length])
+    other.hashes = list(blockchain.hashes[:length])
+    return other
+
+
 class TestBlockchain(unittest.TestCase):
     """Suite de pruebas para la clase Blockchain"""
 
@@ -74,6 +137,44 @@ class TestBlockchain(unittest.TestCase):
             self.blockchain.hash(block2)
         )
 
+    def test_block_canonical_matches_json(self):
+        """Verifica que la serialización de Block coincide con json.dumps ordenado"""
+        block = Block(2, 1234567890.123, [Transaction('alice', 'bøb', 1.5), Transaction('0', 'x', {'b': 1, 'a': 2}),
+                                          {'emisor': 'a', 'receptor': 'b', 'cantidad': 1, 'extra': True}],
+                      'f' * 64, '0' * 4 + 'f' * 60, 35293, 'abc')
+        as_dict = block.to_dict()
+        self.assertEqual(block.canonical(), json.dumps(as_dict, sort_keys=True).encode())
+        self.assertEqual(self.blockchain.hash(block), self.blockchain.hash(as_dict))
+        self.assertEqual(block.hash(), self.blockchain.hash(as_dict))
+
+    def test_block_round_trip(self):
+        """Verifica la conversión entre Block y el formato JSON de la red"""
+        self.blockchain.new_transaction('alice', 'bob', 50)
+        block = self.blockchain.new_block(proof=1)
+        wire = json.loads(json.dumps(block.to_dict()))
+        restored = Block.from_dict(wire)
+
+        self.assertEqual(restored, block)
+        self.assertEqual(restored, wire)
+        self.assertIsInstance(restored['transacciones'][0], Transaction)
+        self.assertEqual(Transaction.from_dict({'emisor': 'a', 'receptor': 'b', 'cantidad': 1, 'x': 2}),
+                         {'emisor': 'a', 'receptor': 'b', 'cantidad': 1, 'x': 2})
+
+    def test_compact_types_have_no_dict(self):
+        """Verifica que bloques y transacciones usan __slots__ en lugar de un diccionario"""
+        self.blockchain.new_transaction('alice', 'bob', 50)
+        block = self.blockchain.new_block(proof=1)
+        self.assertFalse(hasattr(block, '__dict__'))
+        self.assertFalse(hasattr(block['transacciones'][0], '__dict__'))
+
+    def test_block_hash_cache_invalidated_on_edit(self):
+        """Verifica que editar un campo del bloque descarta su hash en caché"""
+        block = self.blockchain.new_block(proof=1)
+        cached = block.hash()
+        block['proof'] = 2
+        self.assertNotEqual(block.hash(), cached)
+        self.assertEqual(block.hash(), self.blockchain.hash(block.to_dict()))
+
     # ============================================
     # Pruebas de Transacciones
     # ============================================
@@ -184,6 +285,48 @@ class TestBlockchain(unittest.TestCase):
         results = [proof1, proof2, proof3]
         self.assertTrue(len(set(results)) > 1)
 
+    def test_fast_kernel_matches_valid_proof(self):
+        """Verifica que el núcleo optimizado encuentra exactamente la prueba que acepta valid_proof"""
+        for difficulty in (1, 2, 3):
+            self.blockchain.difficulty = difficulty
+            for last_proof, last_hash in ((100, 'abc123'), (0, ''), (35293, 'ñandú')):
+                expected = 0
+                while not self.blockchain.valid_proof(last_proof, expected, last_hash):
+                    expected += 1
+                proof, tried = mining.search(last_proof, last_hash, mining.difficulty_target(difficulty))
+                self.assertEqual(proof, expected)
+                self.assertEqual(tried, expected + 1)
+
+    def test_difficulty_target_edges(self):
+        """Verifica los casos límite del objetivo derivado de la dificultad"""
+        self.assertEqual(mining.search(100, 'abc123', mining.difficulty_target(0)), (0, 1))
+        self.assertEqual(mining.search_range(100, 'abc123', mining.difficulty_target(65), 0, 1000), (None, 1000))
+
+    def test_parallel_proof_of_work_matches_serial(self):
+        """Verifica que el minado paralelo devuelve el mismo nonce mínimo que el secuencial"""
+        serial = self.blockchain.proof_of_work(100, 'abc123')
+
+        self.blockchain.workers = 2
+        try:
+            parallel = self.blockchain.proof_of_work(100, 'abc123')
+        finally:
+            self.blockchain._parallel_miner().close()
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual(self.blockchain.mining_stats['procesos'], 2)
+        self.assertGreater(self.blockchain.mining_stats['hashes_por_segundo'], 0)
+
+    def test_parallel_miner_smallest_nonce_across_chunks(self):
+        """Verifica que con bloques pequeños de nonces se sigue devolviendo el menor válido"""
+        miner = ParallelMiner(workers=2, chunk_size=200)
+        try:
+            for last_hash in ('hash1', 'hash2', 'hash3'):
+                proof, tried = miner.search(100, last_hash, 3)
+                self.assertEqual(proof, self.blockchain.proof_of_work(100, last_hash))
+                self.assertGreaterEqual(tried, proof + 1)
+        finally:
+            miner.close()
+
     # ============================================
     # Pruebas de Nodos
     # ============================================
@@ -261,6 +404,209 @@ class TestBlockchain(unittest.TestCase):
         
         self.assertFalse(self.blockchain.valid_chain(self.blockchain.chain))
 
+    # ============================================
+    # Pruebas de Hashes en Caché y Validación Incremental
+    # ============================================
+
+    def test_block_hash_cached_on_creation(self):
+        """Verifica que el hash de cada bloque se guarda al crearlo"""
+        mine_blocks(self.blockchain, 2)
+        self.assertEqual(len(self.blockchain.hashes), len(self.blockchain.chain))
+        for block, block_hash in zip(self.blockchain.chain, self.blockchain.hashes):
+            self.assertEqual(self.blockchain.hash(block), block_hash)
+        self.assertEqual(self.blockchain.last_hash, self.blockchain.hashes[-1])
+
+    def test_fork_point(self):
+        """Verifica que se detecta el prefijo común con otra cadena"""
+        mine_blocks(self.blockchain, 3)
+        other = fork(self.blockchain, 2)
+        mine_blocks(other, 3)
+
+        self.assertEqual(self.blockchain.fork_point(self.blockchain.chain), 4)
+        self.assertEqual(self.blockchain.fork_point(other.chain), 2)
+        self.assertEqual(self.blockchain.fork_point(Blockchain().chain), 0)
+
+    def test_valid_chain_trusted_prefix(self):
+        """Verifica que con un prefijo de confianza solo se valida el sufijo"""
+        mine_blocks(self.blockchain, 3)
+        chain = self.blockchain.chain
+        chain[1]['transacciones'].append({'emisor': 'x', 'receptor': 'y', 'cantidad': 1})
+
+        self.assertFalse(self.blockchain.valid_chain(chain))
+        self.assertTrue(self.blockchain.valid_chain(chain, trusted=3))
+
+    def test_replace_chain_only_hashes_new_blocks(self):
+        """Verifica que adoptar una cadena más larga solo recalcula los bloques nuevos"""
+        mine_blocks(self.blockchain, 20)
+        other = fork(self.blockchain, len(self.blockchain.chain))
+        mine_blocks(other, 2)
+
+        with mock.patch.object(Blockchain, 'hash', side_effect=Blockchain.hash) as counted:
+            self.assertTrue(self.blockchain.replace_chain(other.chain))
+        # log2(21) probes for the fork point plus the two new blocks and their parent
+        self.assertLess(counted.call_count, 12)
+        self.assertEqual(self.blockchain.hashes, other.hashes)
+        self.assertEqual(len(self.blockchain.chain), 23)
+
+    def test_replace_chain_rejects_invalid_suffix(self):
+        """Verifica que no se adopta una cadena con un bloque nuevo inválido"""
+        other = fork(self.blockchain, len(self.blockchain.chain))
+        bad_proof = 0
+        while other.valid_proof(100, bad_proof, other.last_hash):
+            bad_proof += 1
+        other.new_block(proof=bad_proof)
+
+        self.assertFalse(self.blockchain.replace_chain(other.chain))
+        self.assertEqual(len(self.blockchain.chain), 1)
+
+    # ============================================
+    # Pruebas de Árboles de Merkle
+    # ============================================
+
+    def test_merkle_proofs(self):
+        """Verifica las pruebas de inclusión con un número par e impar de transacciones"""
+        for count in (1, 2, 5, 8):
+            blockchain = Blockchain()
+            for i in range(count):
+                blockchain.new_transaction(f'emisor{i}', 'bob', i)
+            block = blockchain.new_block(proof=1)
+
+            for position, tx in enumerate(block['transacciones']):
+                steps = block.merkle_proof(position)
+                self.assertTrue(merkle.verify_proof(tx.to_dict(), steps, block['merkle_root']))
+                self.assertFalse(merkle.verify_proof({'emisor': 'x', 'receptor': 'bob', 'cantidad': position},
+                                                     steps, block['merkle_root']))
+
+    def test_empty_block_merkle_root(self):
+        """Verifica la raíz de Merkle de un bloque sin transacciones"""
+        self.assertEqual(self.blockchain.last_block['merkle_root'], merkle.EMPTY_ROOT)
+        self.assertTrue(self.blockchain.valid_chain(self.blockchain.chain))
+
+    def test_hash_covers_header_only(self):
+        """Verifica que el hash del bloque no depende de las transacciones sino de su raíz"""
+        self.blockchain.new_transaction('alice', 'bob', 5)
+        block = self.blockchain.new_block(proof=1)
+        block_hash = self.blockchain.hash(block)
+
+        block['transacciones'] = [Transaction('alice', 'mallory', 5)]
+        self.assertEqual(self.blockchain.hash(block), block_hash)
+        block['merkle_root'] = 'f' * 64
+        self.assertNotEqual(self.blockchain.hash(block), block_hash)
+
+    def test_tampered_transactions_rejected(self):
+        """Verifica que se rechaza una cadena cuyas transacciones no coinciden con la raíz"""
+        self.blockchain.new_transaction('alice', 'bob', 5)
+        mine_blocks(self.blockchain, 2)
+        chain = [block.to_dict() for block in self.blockchain.chain]
+        self.assertTrue(self.blockchain.valid_chain(chain))
+
+        chain[1]['transacciones'][0]['cantidad'] = 500
+        self.assertFalse(self.blockchain.valid_chain(chain))
+        del chain[1]['merkle_root']
+        self.assertFalse(self.blockchain.valid_chain(chain))
+
+    # ============================================
+    # Pruebas del Mempool
+    # ============================================
+
+    def test_duplicate_transaction_ignored(self):
+        """Verifica que una transacción pendiente repetida no se agrega dos veces"""
+        self.assertEqual(self.blockchain.new_transaction('alice', 'bob', 5), 2)
+        self.assertEqual(self.blockchain.new_transaction('alice', 'bob', 5), 2)
+        self.blockchain.new_transaction('alice', 'bob', 6)
+        self.assertEqual(len(self.blockchain.current_transactions), 2)
+
+    def test_mempool_by_sender(self):
+        """Verifica la búsqueda de transacciones pendientes por emisor"""
+        mempool = Mempool()
+        for i in range(3):
+            mempool.add(Transaction('alice', 'bob', i))
+        mempool.add(Transaction('bob', 'alice', 1))
+
+        self.assertEqual([tx['cantidad'] for tx in mempool.by_sender('alice')], [0, 1, 2])
+        mempool.take(2)
+        self.assertEqual([tx['cantidad'] for tx in mempool.by_sender('alice')], [2])
+        self.assertEqual(len(mempool.by_sender('bob')), 1)
+        self.assertEqual(mempool.by_sender('charlie'), [])
+
+    def test_mempool_evicts_oldest(self):
+        """Verifica que al superar la capacidad se descartan las transacciones más antiguas"""
+        mempool = Mempool(max_transactions=3)
+        for i in range(5):
+            mempool.add(Transaction('alice', 'bob', i))
+        self.assertEqual([tx['cantidad'] for tx in mempool], [2, 3, 4])
+        self.assertEqual(mempool.evicted, 2)
+
+        tx = Transaction('alice', 'bob', 100)
+        mempool = Mempool(max_bytes=len(tx.canonical()) * 2)
+        for i in range(3):
+            mempool.add(Transaction('alice', 'bob', 100 + i))
+        self.assertEqual(len(mempool), 2)
+        self.assertLessEqual(mempool.size, mempool.max_bytes)
+        self.assertIsNone(Mempool(max_bytes=10).add(tx))
+
+    def test_block_takes_bounded_batch(self):
+        """Verifica que cada bloque toma como máximo max_block_transactions transacciones"""
+        self.blockchain.max_block_transactions = 3
+        for i in range(7):
+            self.blockchain.new_transaction('alice', 'bob', i)
+
+        block = self.blockchain.new_block(proof=1)
+        self.assertEqual([tx['cantidad'] for tx in block['transacciones']], [0, 1, 2])
+        self.assertEqual(len(self.blockchain.current_transactions), 4)
+        self.blockchain.new_block(proof=2)
+        self.assertEqual(len(self.blockchain.new_block(proof=3)['transacciones']), 1)
+
+    def test_reward_goes_first(self):
+        """Verifica que la recompensa de minado entra en el bloque aunque el mempool esté lleno"""
+        mempool = Mempool(max_transactions=2)
+        mempool.add(Transaction('alice', 'bob', 1))
+        mempool.add(Transaction('alice', 'bob', 2))
+        mempool.add(Transaction('0', 'minero', 1), first=True)
+
+        self.assertEqual([tx['emisor'] for tx in mempool.take(1)], ['0'])
+        self.assertEqual(len(mempool), 1)
+
+    # ============================================
+    # Pruebas del Índice de Cuentas
+    # ============================================
+
+    def test_account_balances(self):
+        """Verifica saldos e historial por dirección al agregar bloques"""
+        self.blockchain.new_transaction('alice', 'bob', 5)
+        self.blockchain.new_transaction('bob', 'carol', 2)
+        self.blockchain.new_block(proof=1)
+        self.blockchain.new_transaction('0', 'alice', 10)
+        self.blockchain.new_transaction('alice', 'alice', 3)
+        self.blockchain.new_block(proof=2)
+
+        accounts = self.blockchain.accounts
+        self.assertEqual(accounts.balance('alice'), 5)
+        self.assertEqual(accounts.balance('bob'), 3)
+        self.assertEqual(accounts.balance('carol'), 2)
+        self.assertEqual(accounts.balance('nadie'), 0)
+        self.assertEqual(accounts.references('alice'), [(2, 0), (3, 0), (3, 1)])
+        self.assertEqual(accounts.references('bob', 1), [(2, 1)])
+
+    def test_accounts_follow_replaced_chain(self):
+        """Verifica que el índice de cuentas se rebobina al adoptar otra cadena"""
+        self.blockchain.new_transaction('alice', 'bob', 5)
+        mine_blocks(self.blockchain, 1)
+        self.blockchain.new_transaction('alice', 'mallory', 50)
+        mine_blocks(self.blockchain, 2)
+        other = fork(self.blockchain, 2)
+        other.new_transaction('bob', 'carol', 1)
+        mine_blocks(other, 3)
+
+        self.assertTrue(self.blockchain.replace_chain(other.chain))
+        rebuilt = AccountIndex()
+        for block in self.blockchain.chain:
+            rebuilt.apply(block)
+        self.assertEqual(self.blockchain.accounts.balances, rebuilt.balances)
+        self.assertEqual(self.blockchain.accounts.history, rebuilt.history)
+        self.assertEqual(self.blockchain.accounts.balance('mallory'), 0)
+        self.assertEqual(self.blockchain.accounts.balance('carol'), 1)
+
     # ============================================
     # Pruebas de Integración
     # ============================================
@@ -315,6 +661,434 @@ class TestBlockchain(unittest.TestCase):
         self.assertEqual(len(self.blockchain.chain), initial_length + 5)
 
 
+class TestConsensus(unittest.TestCase):
+    """Pruebas del consenso contra nodos locales en varios puertos"""
+
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.blockchain.difficulty = 3
+        mine_blocks(self.blockchain, 2)
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+
+    def add_peer(self, peer, delay=0):
+        server, url = serve_node(peer, delay)
+        self.servers.append(server)
+        self.blockchain.register_node(url)
+        return server
+
+    def test_adopts_longest_valid_chain(self):
+        """Verifica que se adopta la cadena válida más larga entre varios nodos"""
+        shorter = fork(self.blockchain, 2)
+        longer = fork(self.blockchain, 3)
+        mine_blocks(longer, 2)
+        longest = fork(self.blockchain, 3)
+        mine_blocks(longest, 3)
+        longest.chain[-2]['proof'] += 1  # invalid, must be skipped
+
+        for peer in (shorter, longer, longest):
+            self.add_peer(peer)
+
+        self.assertTrue(self.blockchain.resolve_conflicts())
+        self.assertEqual(self.blockchain.hashes, longer.hashes)
+        self.assertEqual(len(self.blockchain.peer_latency), 3)
+        self.assertTrue(all(latency is not None for latency in self.blockchain.peer_latency.values()))
+
+    def test_slow_peers_are_queried_concurrently(self):
+        """Verifica que los nodos lentos se consultan en paralelo"""
+        peers = [fork(self.blockchain, 3) for i in range(4)]
+        mine_blocks(peers[0], 1)
+        for peer in peers:
+            self.add_peer(peer, delay=0.5)
+
+        start = time.perf_counter()
+        self.assertTrue(self.blockchain.resolve_conflicts())
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertEqual(self.blockchain.last_hash, peers[0].last_hash)
+
+    def test_deadline_ignores_late_peers(self):
+        """Verifica que las respuestas posteriores al plazo global se ignoran"""
+        late = fork(self.blockchain, 3)
+        mine_blocks(late, 2)
+        self.add_peer(late, delay=2)
+        self.blockchain.consensus_deadline = 0.3
+
+        start = time.perf_counter()
+        self.assertFalse(self.blockchain.resolve_conflicts())
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(len(self.blockchain.chain), 3)
+
+    def test_only_best_candidate_chain_is_downloaded(self):
+        """Verifica que solo se descarga la cadena del mejor candidato"""
+        shorter = self.add_peer(fork(self.blockchain, 2))
+        equal = self.add_peer(fork(self.blockchain, 3))
+        best_peer = fork(self.blockchain, 3)
+        mine_blocks(best_peer, 2)
+        best = self.add_peer(best_peer)
+        second_peer = fork(self.blockchain, 3)
+        mine_blocks(second_peer, 1)
+        second = self.add_peer(second_peer)
+
+        self.assertTrue(self.blockchain.resolve_conflicts())
+        self.assertEqual(self.blockchain.last_hash, best_peer.last_hash)
+        self.assertEqual(best.hits, ['/cadena/resumen', '/cadena'])
+        for server in (shorter, equal, second):
+            self.assertEqual(server.hits, ['/cadena/resumen'])
+
+    def test_authoritative_chain_downloads_nothing(self):
+        """Verifica que si ningún nodo es más largo no se descarga ninguna cadena"""
+        servers = [self.add_peer(fork(self.blockchain, length)) for length in (1, 2, 3)]
+
+        self.assertFalse(self.blockchain.resolve_conflicts())
+        for server in servers:
+            self.assertEqual(server.hits, ['/cadena/resumen'])
+
+    def test_summary(self):
+        """Verifica el resumen de la cadena"""
+        summary = self.blockchain.summary()
+        self.assertEqual(summary['longitud'], 3)
+        self.assertEqual(summary['ultimo_hash'], self.blockchain.hash(self.blockchain.last_block))
+        self.assertEqual(summary['trabajo'], 3 * 16 ** 3)
+
+    def test_delta_sync_downloads_only_missing_blocks(self):
+        """Verifica que solo se transfieren los bloques posteriores al ancestro común"""
+        mine_blocks(self.blockchain, 27)
+        peer = fork(self.blockchain, 25)
+        mine_blocks(peer, 8)
+        server = self.add_peer(peer)
+
+        self.assertTrue(self.blockchain.resolve_conflicts())
+        self.assertEqual(server.sent, [8])
+        self.assertEqual(self.blockchain.hashes, peer.hashes)
+        self.assertTrue(self.blockchain.valid_chain(self.blockchain.chain))
+
+    def test_delta_sync_rejects_invalid_blocks(self):
+        """Verifica que un sufijo inválido no modifica la cadena local"""
+        peer = fork(self.blockchain, 3)
+        mine_blocks(peer, 2)
+        peer.chain[-1]['proof'] += 1
+        self.add_peer(peer)
+        hashes = list(self.blockchain.hashes)
+
+        self.assertFalse(self.blockchain.resolve_conflicts())
+        self.assertEqual(self.blockchain.hashes, hashes)
+
+    def test_locator_finds_common_ancestor(self):
+        """Verifica que el localizador identifica el último bloque común"""
+        mine_blocks(self.blockchain, 40)
+        peer = fork(self.blockchain, 30)
+        mine_blocks(peer, 5)
+
+        locator = self.blockchain.locator().split(',')
+        self.assertLess(len(locator), 20)
+        self.assertEqual(locator[-1], f'1:{self.blockchain.hashes[0]}')
+        # The locator thins out with depth, so the match may be a bit below the fork
+        self.assertTrue(25 <= peer.locate(self.blockchain.locator()) <= 30)
+        self.assertEqual(self.blockchain.locate(self.blockchain.locator()), 43)
+        self.assertEqual(self.blockchain.locate(Blockchain().locator()), 0)
+        self.assertEqual(self.blockchain.locate('x:y,,99:abc'), 0)
+
+    def test_extend_chain_bounds(self):
+        """Verifica que no se empalman bloques fuera de la cadena local"""
+        self.assertFalse(self.blockchain.extend_chain([], 0))
+        self.assertFalse(self.blockchain.extend_chain([], 4))
+
+    def test_unreachable_peer(self):
+        """Verifica que un nodo caído no impide el consenso"""
+        self.blockchain.register_node('http://127.0.0.1:9')
+        self.assertFalse(self.blockchain.resolve_conflicts())
+        self.assertIsNone(self.blockchain.peer_latency['http://127.0.0.1:9'])
+
+
+class TestMiningJobs(unittest.TestCase):
+    """Pruebas del minado asíncrono expuesto en /minar"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.original_difficulty = node.difficulty
+        node.difficulty = 3
+
+    def tearDown(self):
+        node.difficulty = self.original_difficulty
+
+    def wait_for(self, job_id, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.client.get(f'/minar/{job_id}').get_json()
+            if job['estado'] not in ('en_cola', 'minando'):
+                return job
+            time.sleep(0.01)
+        self.fail('El trabajo de minado no terminó a tiempo')
+
+    def test_post_returns_job_immediately(self):
+        """Verifica que POST /minar responde con un id sin esperar al minado"""
+        longitud = len(node.chain)
+        resp = self.client.post('/minar')
+        self.assertEqual(resp.status_code, 202)
+        job = self.wait_for(resp.get_json()['id'])
+
+        self.assertEqual(job['estado'], 'completado')
+        self.assertEqual(job['bloque']['indice'], longitud + 1)
+        self.assertGreater(job['intentos'], 0)
+        self.assertTrue(node.valid_proof(node.chain[-2]['proof'], job['bloque']['proof'],
+                                         job['bloque']['previous_hash']))
+
+    def test_cancel_running_job(self):
+        """Verifica que un trabajo en curso se puede cancelar"""
+        node.difficulty = 12  # imposible de resolver durante la prueba
+        longitud = len(node.chain)
+        job_id = self.client.post('/minar').get_json()['id']
+
+        resp = self.client.delete(f'/minar/{job_id}')
+        self.assertEqual(resp.status_code, 200)
+        job = self.wait_for(job_id)
+        self.assertEqual(job['estado'], 'cancelado')
+        self.assertIsNone(job['bloque'])
+        self.assertEqual(len(node.chain), longitud)
+
+    def test_job_superseded_when_tip_changes(self):
+        """Verifica que un trabajo se descarta si cambia la punta de la cadena"""
+        node.difficulty = 12
+        job_id = self.client.post('/minar').get_json()['id']
+        while mining_jobs.get(job_id).base_hash is None:
+            time.sleep(0.01)
+
+        mining_jobs.supersede('otro_hash')
+        job = self.wait_for(job_id)
+        self.assertEqual(job['estado'], 'reemplazado')
+
+    def test_unknown_job(self):
+        """Verifica que un id desconocido devuelve 404"""
+        self.assertEqual(self.client.get('/minar/no-existe').status_code, 404)
+        self.assertEqual(self.client.delete('/minar/no-existe').status_code, 404)
+
+
+class TestChainEndpoints(unittest.TestCase):
+    """Pruebas de la lectura paginada y en streaming de la cadena"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.original_difficulty = node.difficulty
+        node.difficulty = 3
+        if len(node.chain) < 5:
+            mine_blocks(node, 5 - len(node.chain))
+
+    def tearDown(self):
+        node.difficulty = self.original_difficulty
+
+    def test_chain_from_index(self):
+        """Verifica que /cadena?desde devuelve solo los bloques desde ese índice"""
+        data = self.client.get('/cadena?desde=2').get_json()
+        self.assertEqual(data['desde'], 2)
+        self.assertEqual(data['longitud'], len(node.chain))
+        self.assertEqual(len(data['cadena']), len(node.chain) - 1)
+        self.assertIsNone(data['siguiente'])
+        self.assertEqual(self.client.get('/cadena').get_json()['desde'], 1)
+
+    def test_pagination_with_cursor(self):
+        """Verifica que se puede recorrer la cadena por páginas con el cursor"""
+        blocks = []
+        url = '/cadena?limite=2'
+        while True:
+            data = self.client.get(url).get_json()
+            self.assertLessEqual(len(data['cadena']), 2)
+            blocks.extend(data['cadena'])
+            if data['siguiente'] is None:
+                break
+            url = f"/cadena?limite=2&desde={data['siguiente']}"
+
+        self.assertEqual(blocks, self.client.get('/cadena').get_json()['cadena'])
+
+    def test_ndjson_stream(self):
+        """Verifica que el modo streaming emite un bloque por línea"""
+        resp = self.client.get('/cadena?formato=ndjson&desde=2&limite=3')
+        self.assertEqual(resp.mimetype, 'application/x-ndjson')
+        lines = resp.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['indice'] for line in lines], [2, 3, 4])
+
+    def test_single_block(self):
+        """Verifica la consulta de un único bloque por índice"""
+        resp = self.client.get('/bloques/1')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()['previous_hash'], '1')
+        self.assertEqual(self.client.get('/bloques/2').get_json()['previous_hash'], node.hashes[0])
+        self.assertEqual(self.client.get('/bloques/0').status_code, 404)
+        self.assertEqual(self.client.get(f'/bloques/{len(node.chain) + 1}').status_code, 404)
+
+    def test_pending_transactions(self):
+        """Verifica que /transacciones/pendientes lista el mempool y filtra por emisor"""
+        tx = {'emisor': 'pendiente-a', 'receptor': 'b', 'cantidad': 7}
+        self.assertEqual(self.client.post('/transacciones/nueva', json=tx).status_code, 201)
+        self.assertEqual(self.client.post('/transacciones/nueva', json=tx).status_code, 201)
+
+        data = self.client.get('/transacciones/pendientes?emisor=pendiente-a').get_json()
+        self.assertEqual(data['transacciones'], [tx])
+        self.assertEqual(data['pendientes'], len(node.current_transactions))
+        self.assertIn(tx, self.client.get('/transacciones/pendientes').get_json()['transacciones'])
+
+    def test_transaction_batch(self):
+        """Verifica el envío de transacciones en lote como arreglo JSON y como NDJSON"""
+        batch = [{'emisor': 'lote', 'receptor': 'b', 'cantidad': i} for i in range(50)]
+        resp = self.client.post('/transacciones/lote', json=batch + batch[:1])
+        self.assertEqual(resp.status_code, 201)
+        data = resp.get_json()
+        self.assertEqual((data['aceptadas'], data['duplicadas']), (50, 1))
+        self.assertEqual(data['resultados'][0]['id'], data['resultados'][50]['id'])
+        self.assertEqual(data['resultados'][50]['estado'], 'duplicada')
+
+        ndjson = '\n'.join(json.dumps({'emisor': 'lote-nd', 'receptor': 'b', 'cantidad': i}) for i in range(3))
+        resp = self.client.post('/transacciones/lote', data=ndjson, content_type='application/x-ndjson')
+        self.assertEqual(resp.get_json()['aceptadas'], 3)
+        self.assertEqual(len(node.current_transactions.by_sender('lote-nd')), 3)
+
+    def test_transaction_batch_is_atomic(self):
+        """Verifica que un lote con una transacción inválida no agrega ninguna"""
+        pending = len(node.current_transactions)
+        batch = [{'emisor': 'atomico', 'receptor': 'b', 'cantidad': 1}, {'emisor': 'atomico'}]
+        resp = self.client.post('/transacciones/lote', json=batch)
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([r['estado'] for r in resp.get_json()['resultados']], ['valida', 'invalida'])
+        self.assertEqual(len(node.current_transactions), pending)
+        self.assertEqual(self.client.post('/transacciones/lote', json={'emisor': 'a'}).status_code, 400)
+        self.assertEqual(self.client.post('/transacciones/lote', data='{',
+                                          content_type='application/x-ndjson').status_code, 400)
+
+    def test_account_endpoints(self):
+        """Verifica /cuentas/<direccion> y la paginación de su historial"""
+        for i in range(5):
+            node.new_transaction('cuenta-a', 'cuenta-b', i)
+        mine_blocks(node, 1)
+
+        data = self.client.get('/cuentas/cuenta-b').get_json()
+        self.assertEqual((data['saldo'], data['transacciones']), (10, 5))
+
+        page = self.client.get('/cuentas/cuenta-a/historial?limite=2').get_json()
+        self.assertEqual([e['transaccion']['cantidad'] for e in page['historial']], [0, 1])
+        self.assertEqual((page['total'], page['siguiente']), (5, 2))
+        last = self.client.get('/cuentas/cuenta-a/historial?limite=2&desde=4').get_json()
+        self.assertEqual(len(last['historial']), 1)
+        self.assertIsNone(last['siguiente'])
+        self.assertEqual(last['historial'][0]['bloque'], len(node.chain))
+
+    def test_transaction_proof(self):
+        """Verifica que /transacciones/prueba devuelve una prueba verificable con la cabecera"""
+        data = self.client.get('/transacciones/prueba/2/0').get_json()
+        header = data['cabecera']
+        self.assertNotIn('transacciones', header)
+        self.assertEqual(Blockchain.hash(header), data['hash_bloque'])
+        self.assertEqual(data['hash_bloque'], node.hashes[1])
+        self.assertTrue(merkle.verify_proof(data['transaccion'], data['prueba'], header['merkle_root']))
+
+        self.assertEqual(self.client.get('/transacciones/prueba/1/0').status_code, 404)
+        self.assertEqual(self.client.get(f'/transacciones/prueba/{len(node.chain) + 1}/0').status_code, 404)
+
+
+class TestConcurrency(unittest.TestCase):
+    """Pruebas de acceso concurrente al estado de la blockchain"""
+
+    def setUp(self):
+        self.blockchain = Blockchain()
+        self.blockchain.difficulty = 2
+        self.blockchain.max_block_transactions = 40
+        patcher = mock.patch('blockchain.blockchain', self.blockchain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rwlock(self):
+        """Verifica que el cerrojo admite varios lectores y excluye al escritor"""
+        lock = RWLock()
+        readers_in = threading.Barrier(3, timeout=5)
+        events = []
+
+        def reader():
+            with lock.read():
+                readers_in.wait()  # all three readers hold the lock at once
+                time.sleep(0.05)
+                events.append('lectura')
+
+        def writer():
+            readers_in.wait()
+            with lock.write():
+                events.append('escritura')
+
+        threads = [threading.Thread(target=reader) for _ in range(2)] + [threading.Thread(target=writer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # The writer got in only once both readers were done
+        self.assertEqual(events, ['lectura', 'lectura', 'escritura'])
+
+        with lock.write():
+            with lock.write(), lock.read():
+                pass
+        with lock.read():
+            with self.assertRaises(RuntimeError):
+                with lock.write():
+                    pass
+
+    def test_no_transaction_lost_under_load(self):
+        """Verifica que con muchos clientes concurrentes no se pierde ni duplica ninguna transacción"""
+        clients, per_client = 8, 60
+        errors = []
+        done = threading.Event()
+
+        def submit(client_id):
+            client = app.test_client()
+            for i in range(per_client):
+                tx = {'emisor': f'cliente{client_id}', 'receptor': 'b', 'cantidad': i}
+                if i % 2:
+                    resp = client.post('/transacciones/nueva', json=tx)
+                else:
+                    resp = client.post('/transacciones/lote', json=[tx])
+                if resp.status_code != 201:
+                    errors.append(resp.status_code)
+
+        def mine():
+            client = app.test_client()
+            while not done.is_set():
+                status = client.get('/minar').status_code
+                if status not in (200, 409):
+                    errors.append(status)
+
+        def read():
+            client = app.test_client()
+            while not done.is_set():
+                data = client.get('/cadena').get_json()
+                chain = data['cadena']
+                if len(chain) != data['longitud']:
+                    errors.append('longitud inconsistente')
+                for previous, block in zip(chain, chain[1:]):
+                    if block['previous_hash'] != Blockchain.hash(previous):
+                        errors.append('cadena inconsistente')
+
+        submitters = [threading.Thread(target=submit, args=(i,)) for i in range(clients)]
+        background = [threading.Thread(target=mine) for _ in range(2)] + [threading.Thread(target=read) for _ in range(2)]
+        for thread in submitters + background:
+            thread.start()
+        for thread in submitters:
+            thread.join()
+        done.set()
+        for thread in background:
+            thread.join()
+
+        client = app.test_client()
+        while len(self.blockchain.current_transactions):
+            client.get('/minar')
+
+        confirmed = [(tx['emisor'], tx['cantidad']) for block in self.blockchain.chain
+                     for tx in block['transacciones'] if tx['emisor'] != '0']
+        expected = [(f'cliente{c}', i) for c in range(clients) for i in range(per_client)]
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(confirmed), sorted(expected))
+        self.assertTrue(self.blockchain.valid_chain(self.blockchain.chain))
+        self.assertEqual(self.blockchain.accounts.balance('b'), clients * sum(range(per_client)))
+
+
 class TestBlockchainEdgeCases(unittest.TestCase):
     """Pruebas para casos extremos y errores"""
 
@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+import unittest
+from blockchain import Blockchain
+from storage import INDEX_RECORD, SegmentLogStorage, SQLiteStorage
+
+
+def mine_blocks(blockchain, count):
+    """Mina `count` bloques válidos sobre la punta de `blockchain`"""
+    for i in range(count):
+        last_block = blockchain.last_block
+        last_hash = blockchain.last_hash
+        proof = blockchain.proof_of_work(last_block['proof'], last_hash)
+        blockchain.new_block(proof, last_hash)
+
+
+class StorageTests:
+    """Pruebas comunes a todos los almacenes de bloques"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = self.open()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = self.open()
+        return self.storage
+
+    def test_append_and_read(self):
+        """Verifica que los bloques se leen por posición con su hash"""
+        for i in range(5):
+            self.storage.append(f'bloque {i}'.encode(), f'{i:064x}')
+
+        self.assertEqual(len(self.storage), 5)
+        self.assertEqual(bytes(self.storage.read(3)), b'bloque 3')
+        self.assertEqual(self.storage.hash_at(4), f'{4:064x}')
+        self.assertEqual(self.storage.hashes(), [f'{i:064x}' for i in range(5)])
+        with self.assertRaises(IndexError):
+            self.storage.read(5)
+
+    def test_data_survives_reopen(self):
+        """Verifica que los bloques persisten al reabrir el almacén"""
+        self.storage.append(b'a', '1' * 64)
+        self.storage.append(b'b', '2' * 64)
+        storage = self.reopen()
+
+        self.assertEqual(len(storage), 2)
+        self.assertEqual(bytes(storage.read(1)), b'b')
+        storage.append(b'c', '3' * 64)
+        self.assertEqual(bytes(self.reopen().read(2)), b'c')
+
+    def test_truncate(self):
+        """Verifica que truncar descarta los bloques finales también en disco"""
+        for i in range(4):
+            self.storage.append(f'bloque {i}'.encode(), f'{i:064x}')
+        self.storage.truncate(2)
+        self.storage.append(b'nuevo', 'f' * 64)
+
+        storage = self.reopen()
+        self.assertEqual(len(storage), 3)
+        self.assertEqual(bytes(storage.read(1)), b'bloque 1')
+        self.assertEqual(bytes(storage.read(2)), b'nuevo')
+        storage.truncate(0)
+        self.assertEqual(len(self.reopen()), 0)
+
+
+class TestSegmentLogStorage(StorageTests, unittest.TestCase):
+
+    def open(self):
+        return SegmentLogStorage(self.directory, segment_size=64, fsync=False)
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith('segment-'))
+
+    def test_rolls_over_segments(self):
+        """Verifica que los bloques se reparten en varios segmentos"""
+        for i in range(10):
+            self.storage.append(b'x' * 30, f'{i:064x}')
+
+        self.assertEqual(len(self.segments()), 5)
+        self.assertEqual(bytes(self.reopen().read(9)), b'x' * 30)
+        self.storage.truncate(3)
+        self.assertEqual(len(self.segments()), 2)
+
+    def test_recovers_partial_index_record(self):
+        """Verifica que un registro de índice a medias se descarta al reabrir"""
+        self.storage.append(b'a', '1' * 64)
+        with open(os.path.join(self.directory, 'index.bin'), 'ab') as index:
+            index.write(b'\x00' * (INDEX_RECORD.size // 2))
+
+        storage = self.reopen()
+        self.assertEqual(len(storage), 1)
+        storage.append(b'b', '2' * 64)
+        self.assertEqual(bytes(self.reopen().read(1)), b'b')
+
+    def test_recovers_unindexed_and_missing_data(self):
+        """Verifica que se ignoran datos sin indexar e índices sin datos"""
+        self.storage.append(b'a', '1' * 64)
+        self.storage.append(b'bb', '2' * 64)
+        segment = os.path.join(self.directory, self.segments()[0])
+        with open(segment, 'r+b') as f:
+            f.truncate(2)  # the second block never reached the disk
+
+        storage = self.reopen()
+        self.assertEqual(len(storage), 1)
+        self.assertEqual(os.path.getsize(segment), 1)
+
+        with open(segment, 'ab') as f:
+            f.write(b'basura')
+        storage = self.reopen()
+        self.assertEqual(os.path.getsize(segment), 1)
+        storage.append(b'c', '3' * 64)
+        self.assertEqual(bytes(self.reopen().read(1)), b'c')
+
+
+class TestSQLiteStorage(StorageTests, unittest.TestCase):
+
+    def open(self):
+        return SQLiteStorage(os.path.join(self.directory, 'cadena.db'))
+
+
+class TestBlockchainStorage(unittest.TestCase):
+    """Pruebas de una blockchain respaldada por un almacén duradero"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self):
+        blockchain = Blockchain(storage=SegmentLogStorage(self.directory, fsync=False))
+        blockchain.difficulty = 3
+        return blockchain
+
+    def test_restart_restores_chain(self):
+        """Verifica que al reiniciar se recupera la cadena sin recalcular hashes"""
+        blockchain = self.open()
+        blockchain.new_transaction('alice', 'bob', 5)
+        mine_blocks(blockchain, 3)
+        chain, hashes = list(blockchain.chain), list(blockchain.hashes)
+        blockchain.storage.close()
+
+        restarted = self.open()
+        self.assertEqual(list(restarted.chain), chain)
+        self.assertEqual(list(restarted.hashes), hashes)
+        self.assertTrue(restarted.valid_chain(restarted.chain))
+
+        self.assertEqual(restarted.accounts.balance('bob'), 5)
+        self.assertEqual(restarted.accounts.references('alice'), [(2, 0)])
+
+        mine_blocks(restarted, 1)
+        restarted.storage.close()
+        self.assertEqual(len(self.open().chain), 5)
+
+    def test_splice_is_persisted(self):
+        """Verifica que adoptar otra cadena también reescribe el almacén"""
+        blockchain = self.open()
+        mine_blocks(blockchain, 3)
+        other = Blockchain()
+        other.difficulty = 3
+        other.chain = list(blockchain.chain[:2])
+        other.hashes = list(blockchain.hashes[:2])
+        mine_blocks(other, 4)
+
+        self.assertTrue(blockchain.replace_chain(other.chain))
+        blockchain.storage.close()
+        self.assertEqual(list(self.open().hashes), other.hashes)
+
+    def test_memory_window(self):
+        """Verifica que solo los bloques recientes quedan en memoria y el resto se carga bajo demanda"""
+        blockchain = Blockchain(storage=SegmentLogStorage(self.directory, fsync=False), window=5)
+        blockchain.difficulty = 3
+        blockchain.chain.cache_size = 3
+        mine_blocks(blockchain, 30)
+
+        self.assertEqual(len(blockchain.chain), 31)
+        self.assertEqual(len(blockchain.chain._recent), 5)
+        self.assertEqual(blockchain.chain[0]['previous_hash'], '1')
+        self.assertEqual(blockchain.chain[-1]['indice'], 31)
+        self.assertEqual([block['indice'] for block in blockchain.chain[8:11]], [9, 10, 11])
+        self.assertTrue(blockchain.valid_chain(blockchain.chain))
+        for position in range(20):
+            self.assertEqual(blockchain.chain[position]['indice'], position + 1)
+        self.assertEqual(len(blockchain.chain._cache), 3)
+        self.assertEqual(blockchain.last_hash, blockchain.hash(blockchain.last_block))
+        with self.assertRaises(IndexError):
+            blockchain.chain[31]
+
+    def test_memory_window_after_truncate(self):
+        """Verifica que la ventana sigue siendo coherente tras reemplazar el final de la cadena"""
+        blockchain = Blockchain(storage=SegmentLogStorage(self.directory, fsync=False), window=3)
+        blockchain.difficulty = 3
+        mine_blocks(blockchain, 6)
+        blockchain.chain[2]  # cached
+        other = Blockchain()
+        other.difficulty = 3
+        other.chain = list(blockchain.chain[:2])
+        other.hashes = list(blockchain.hashes[:2])
+        mine_blocks(other, 8)
+
+        self.assertTrue(blockchain.replace_chain(other.chain))
+        self.assertEqual(list(blockchain.chain), other.chain)
+        self.assertEqual(blockchain.chain[2], other.chain[2])
+        self.assertEqual(len(blockchain.chain._recent), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)